@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -7,12 +12,17 @@ from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 
 from .config import get_settings
-from .deps import get_db
+from .deps import get_async_db
 from .models import User, Tenant, TenantPlan, UserRole
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256"],
+    deprecated="auto",
+    bcrypt_sha256__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def hash_password(password: str) -> str:
@@ -21,6 +31,82 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+
+# -------------------------
+# Async password hashing
+# -------------------------
+class PasswordHasher:
+    """
+    Runs bcrypt (~100-300 ms of CPU per call) on its own bounded thread pool
+    so a burst of logins can't occupy the event loop or the request
+    threadpool. bcrypt releases the GIL, so threads scale across cores.
+    Beyond `workers + max_queued` calls in flight, callers get a 503.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queued: int):
+        self.context = context
+        self.workers = workers
+        self.max_queued = max_queued
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="passwords")
+            return self._pool
+
+    def warm_up(self) -> None:
+        self._get_pool()
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.workers + self.max_queued:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+        finally:
+            self._in_flight -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, plain: str, hashed: str) -> tuple[bool, str | None]:
+        """(valid, new_hash); new_hash is set when the stored hash's cost is outdated."""
+        valid, new_hash = await self._run(self.context.verify_and_update, plain, hashed)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher(pwd_context, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUED)
+
 def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
@@ -32,6 +118,8 @@ def create_access_token(user: User) -> str:
         "sub": str(user.id),
         "tenant_id": str(user.tenant_id),
         "role": user.role.value,
+        "email": user.email,
+        "active": bool(user.is_active),
         "type": "access",
     }
     return create_token(data, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -53,9 +141,109 @@ class TokenData:
         self.role = role
 
 
-def get_current_user(
+# -------------------------
+# Principal cache
+# -------------------------
+class PrincipalCache:
+    """
+    TTL + LRU cache of detached ORM rows keyed by id, so authenticating a
+    request doesn't cost a database round trip. Rows are expunged from their
+    session before caching and must be treated as read-only.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, row) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, row)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS, settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES)
+tenant_cache = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS, settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES)
+
+# Users deactivated in this process -> when their last access token expires.
+# Only consulted when AUTH_TRUST_CLAIMS skips the user lookup.
+_revoked_until: dict[str, float] = {}
+
+
+def invalidate_user(user_id) -> None:
+    user_cache.invalidate(str(user_id).lower())
+
+
+def invalidate_tenant(tenant_id) -> None:
+    tenant_cache.invalidate(str(tenant_id).lower())
+
+
+def revoke_user(user_id) -> None:
+    """Reject the user's outstanding access tokens, even in trust-claims mode."""
+    invalidate_user(user_id)
+    now = time.time()
+    for key, until in list(_revoked_until.items()):
+        if until < now:
+            del _revoked_until[key]
+    _revoked_until[str(user_id).lower()] = now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    history = inspect(target).attrs.is_active.history
+    if history.has_changes() and not target.is_active:
+        revoke_user(target.id)
+    else:
+        invalidate_user(target.id)
+
+
+@event.listens_for(Tenant, "after_update")
+def _tenant_updated(mapper, connection, target: Tenant) -> None:
+    invalidate_tenant(target.id)
+
+
+def _user_from_claims(payload: dict) -> User | None:
+    """Transient User built from a signed access token (no database access)."""
+    if not payload.get("active") or payload.get("email") is None:
+        # Tokens issued before claims carried these fields.
+        return None
+    return User(
+        id=payload["sub"],
+        tenant_id=payload["tenant_id"],
+        email=payload["email"],
+        role=UserRole(payload["role"]),
+        is_active=True,
+    )
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,17 +263,39 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.user_id, User.is_active == True).first()
+    if settings.AUTH_TRUST_CLAIMS:
+        if _revoked_until.get(token_data.user_id.lower(), 0) > time.time():
+            raise credentials_exception
+        user = _user_from_claims(payload)
+        if user is not None:
+            return user
+
+    cache_key = token_data.user_id.lower()
+    user = user_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).filter(User.id == token_data.user_id, User.is_active == True))
+    user = result.scalars().first()
     if not user:
         raise credentials_exception
+    db.expunge(user)
+    user_cache.put(cache_key, user)
     return user
 
 
-def get_current_tenant(
+async def get_current_tenant(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Tenant:
-    tenant = db.query(Tenant).filter(Tenant.id == current_user.tenant_id).first()
+    cache_key = str(current_user.tenant_id).lower()
+    tenant = tenant_cache.get(cache_key)
+    if tenant is None:
+        result = await db.execute(select(Tenant).filter(Tenant.id == current_user.tenant_id))
+        tenant = result.scalars().first()
+        if tenant is not None:
+            db.expunge(tenant)
+            tenant_cache.put(cache_key, tenant)
     if not tenant or not tenant.is_active:
         raise HTTPException(status_code=403, detail="Tenant inactive or missing")
 
@@ -0,0 +1,108 @@
+# backend/app/bench_passwords.py
+"""
+Login throughput benchmark for the password hasher.
+
+Runs `--logins` password verifications at `--concurrency` through
+app.auth.password_hasher (the same bounded pool /auth/login uses) and
+reports logins/s overall and per worker core:
+
+    python -m app.bench_passwords --logins 200 --concurrency 50
+
+With --url it instead drives a running API's /auth/login for an existing
+account, which includes the database lookup and token minting:
+
+    python -m app.bench_passwords --url http://localhost:8000 \\
+        --email a@example.com --password secret
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import aiohttp
+from fastapi import HTTPException
+
+from app.auth import password_hasher, pwd_context
+
+
+async def _timed(latencies: list, rejected: list, call) -> None:
+    start = time.perf_counter()
+    try:
+        await call()
+    except HTTPException:
+        rejected.append(1)
+        return
+    latencies.append(time.perf_counter() - start)
+
+
+async def _drive(logins: int, concurrency: int, call) -> dict:
+    latencies: list[float] = []
+    rejected: list[int] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            await _timed(latencies, rejected, call)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "logins": len(latencies),
+        "rejected": len(rejected),
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+    }
+
+
+async def bench_hasher(logins: int, concurrency: int) -> dict:
+    hashed = pwd_context.hash("benchmark-password")
+
+    async def call():
+        valid, _ = await password_hasher.verify_and_update("benchmark-password", hashed)
+        assert valid
+
+    result = await _drive(logins, concurrency, call)
+    cores = min(password_hasher.workers, os.cpu_count() or 1)
+    result["workers"] = password_hasher.workers
+    result["logins_per_second_per_core"] = round(result["logins_per_second"] / cores, 2)
+    password_hasher.shutdown()
+    return result
+
+
+async def bench_http(url: str, email: str, password: str, logins: int, concurrency: int) -> dict:
+    async with aiohttp.ClientSession() as session:
+
+        async def call():
+            async with session.post(
+                f"{url.rstrip('/')}/auth/login",
+                json={"email": email, "password": password},
+            ) as res:
+                if res.status == 503:
+                    raise HTTPException(503)
+                res.raise_for_status()
+                await res.read()
+
+        return await _drive(logins, concurrency, call)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    if args.url:
+        result = asyncio.run(bench_http(args.url, args.email, args.password, args.logins, args.concurrency))
+    else:
+        result = asyncio.run(bench_hasher(args.logins, args.concurrency))
+    for key, value in result.items():
+        print(f"{key:>28}: {value}")
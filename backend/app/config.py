@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings
 from functools import lru_cache
 import urllib.parse
 import os
+import tempfile
 
 
 class Settings(BaseSettings):
@@ -9,14 +10,90 @@ class Settings(BaseSettings):
     AZURE_SQL_CONNSTRING: str
     AZURE_BLOB_CONNSTRING: str
     BLOB_CONTAINER: str = "tenant-files"
+    BLOB_POOL_SIZE: int = 20
+    BLOB_CONNECTION_TIMEOUT: int = 10
+    BLOB_READ_TIMEOUT: int = 120
+    UPLOAD_BLOCK_SIZE: int = 4 * 1024 * 1024
+    UPLOAD_CONCURRENCY: int = 4
+    # SQLAlchemy URL overriding AZURE_SQL_CONNSTRING, e.g. "sqlite:///./dev.db"
+    # for local testing (the async engine then uses aiosqlite).
+    DATABASE_URL: str | None = None
+    # Connection pool (per engine; the app runs one sync and one async engine)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    # Local filesystem stand-in for Blob Storage (tests / offline dev)
+    BLOB_LOCAL_ROOT: str | None = None
+    # Downloads: "proxy" streams through the API (Range-aware); "redirect" sends
+    # clients to a short-lived read-only SAS URL so bytes skip the API.
+    DOWNLOAD_MODE: str = "proxy"
+    DOWNLOAD_SAS_EXPIRY_MINUTES: int = 15
+    # Direct browser -> Blob uploads (SAS with create/write only, then /upload-complete).
+    # A service SAS can't be revoked, so keep the window in which the client
+    # could still rewrite the blob short.
+    UPLOAD_SAS_EXPIRY_MINUTES: int = 15
     #OPENAI_KEY: str should be handled within ACA env now.
 
+    # --- Insights caching ---
+    DATAFRAME_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    INSIGHTS_RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # --- Streaming mode (raw CSVs above the threshold are profiled chunk-wise, never loaded whole) ---
+    STREAMING_THRESHOLD_BYTES: int = 512 * 1024 * 1024
+
+    # --- Sampling mode (raw CSVs above the threshold are sampled, not loaded) ---
+    SAMPLING_THRESHOLD_BYTES: int = 1024 * 1024 * 1024
+    SAMPLE_ROWS: int = 200_000
+    CSV_CHUNK_ROWS: int = 100_000
+
+    # --- Analytics executor ---
+    ANALYTICS_EXECUTOR: str = "thread"  # "thread" or "process"
+    ANALYTICS_WORKERS: int = 2
+    ANALYTICS_IO_WORKERS: int = 16
+    TENANT_MAX_CONCURRENCY: int = 2
+    TENANT_MAX_QUEUED: int = 8
+
+    # --- Ingestion jobs (SQLite-backed queue; INGEST_WORKERS=0 -> run `python -m app.jobs`) ---
+    # Outside the source tree by default; point at a persistent volume in production.
+    INGEST_QUEUE_PATH: str = os.path.join(tempfile.gettempdir(), "beam_ingest_jobs.sqlite3")
+    INGEST_WORKERS: int = 1
+    INGEST_POLL_SECONDS: float = 2.0
+    INGEST_MAX_ATTEMPTS: int = 3
+    INGEST_JOB_TIMEOUT_SECONDS: int = 3600
+
+    # --- AI summaries ---
+    LLM_PROVIDER: str = "openai"  # "openai" or "fake"
+    LLM_MODEL: str = "gpt-4.1-mini"
+    SUMMARY_CACHE_MAX_ENTRIES: int = 1000
+    # What each summary id was computed for (small), kept longer than the
+    # summaries themselves so an evicted one can be recomputed from its id.
+    SUMMARY_REQUESTS_MAX_ENTRIES: int = 20000
+    # Summaries run on their own pool and per-tenant limits, so slow LLM calls
+    # never hold the tenant's insights slots (TENANT_MAX_CONCURRENCY).
+    SUMMARY_WORKERS: int = 8
+    SUMMARY_TENANT_MAX_CONCURRENCY: int = 2
+    SUMMARY_TENANT_MAX_QUEUED: int = 16
+    EXACT_RESULTS_MAX_ENTRIES: int = 100
+
 
     # --- JWT ---
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Authenticated principals (user / tenant rows) are cached for this long;
+    # 0 looks them up on every request. Updates through the ORM invalidate.
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    # Trust signed access-token claims (user, tenant, role, active) for the
+    # token lifetime instead of reading the user row at all.
+    AUTH_TRUST_CLAIMS: bool = False
+
+    # --- Password hashing (bcrypt on a dedicated bounded pool; 503 when full) ---
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # stored hashes with other costs are upgraded on login
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUED: int = 32
 
     # --- Trial settings ---
     TRIAL_DAYS: int = 14
@@ -27,6 +104,8 @@ class Settings(BaseSettings):
 
     @property
     def sqlalchemy_database_uri(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         parts = {}
         for segment in self.AZURE_SQL_CONNSTRING.split(";"):
             if not segment.strip():
@@ -53,6 +132,18 @@ class Settings(BaseSettings):
             f"?driver={driver}&Encrypt=yes&TrustServerCertificate=no"
         )
 
+    @property
+    def async_database_uri(self) -> str:
+        """Same database through an async driver (aioodbc / aiosqlite)."""
+        uri = self.sqlalchemy_database_uri
+        for sync_prefix, async_prefix in (
+            ("mssql+pyodbc://", "mssql+aioodbc://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if uri.startswith(sync_prefix):
+                return async_prefix + uri[len(sync_prefix):]
+        return uri
+
 
 @lru_cache
 def get_settings() -> Settings:
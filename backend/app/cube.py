@@ -0,0 +1,165 @@
+# backend/app/cube.py
+"""
+Pre-aggregated cube over the filterable (categorical) dimensions of a dataset.
+
+For every observed combination of dimension values we keep the row count and,
+per numeric column, the non-null count, sum and sum of squares, plus the
+histogram bin counts of the chart column. Any equality / isin filter over the
+dimensions is then answered by summing the matching cells instead of
+re-scanning rows.
+
+`query()` returns a profile-shaped dict (see app.profiling) so the same
+insight builders serve both. Exact-row work such as correlation still needs
+the rows.
+"""
+import numpy as np
+import pandas as pd
+
+from app.filter_index import MAX_FILTER_VALUES, is_noop_filter
+from app.profiling import HISTOGRAM_BINS, categorical_columns, numeric_columns
+
+# Skip the cube when the dimension product would exceed this many cells.
+MAX_CUBE_CELLS = 200_000
+
+
+class AggregateCube:
+    def __init__(self, df: pd.DataFrame):
+        self.numeric = numeric_columns(df)
+        self.categorical = categorical_columns(df)
+        self.dims: list[str] = []
+        self.categories: dict[str, list] = {}
+
+        size = 1
+        for col in self.categorical:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                continue
+            if len(df[col].cat.categories) > MAX_FILTER_VALUES:
+                continue
+            card = len(df[col].cat.categories) + 1  # +1 for null
+            if size * card > MAX_CUBE_CELLS:
+                continue
+            size *= card
+            self.dims.append(col)
+            self.categories[col] = list(df[col].cat.categories)
+
+        # Cell id per row (mixed radix over dimension codes; null -> last slot).
+        cell_id = np.zeros(len(df), dtype=np.int64)
+        for col in self.dims:
+            codes = df[col].cat.codes.to_numpy().astype(np.int64)
+            card = len(self.categories[col]) + 1
+            codes[codes < 0] = card - 1
+            cell_id = cell_id * card + codes
+
+        cells, inverse = np.unique(cell_id, return_inverse=True)
+        n_cells = len(cells)
+
+        # Decode each observed cell back to its per-dimension codes.
+        self.cell_codes = np.zeros((n_cells, len(self.dims)), dtype=np.int64)
+        rest = cells.copy()
+        for i in range(len(self.dims) - 1, -1, -1):
+            card = len(self.categories[self.dims[i]]) + 1
+            self.cell_codes[:, i] = rest % card
+            rest //= card
+
+        self.rows = np.bincount(inverse, minlength=n_cells)
+        self.count = {}
+        self.sum = {}
+        self.sumsq = {}
+        for col in self.numeric:
+            x = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            valid = ~np.isnan(x)
+            xv = np.where(valid, x, 0.0)
+            self.count[col] = np.bincount(inverse, weights=valid, minlength=n_cells)
+            self.sum[col] = np.bincount(inverse, weights=xv, minlength=n_cells)
+            self.sumsq[col] = np.bincount(inverse, weights=xv * xv, minlength=n_cells)
+
+        # Histogram of the chart column, with bin edges fixed over the full dataset.
+        self.hist_col = self.numeric[0] if self.numeric else None
+        self.hist_edges = None
+        self.hist_counts = None
+        if self.hist_col is not None:
+            x = df[self.hist_col].to_numpy(dtype="float64", na_value=np.nan)
+            valid = ~np.isnan(x)
+            if valid.any():
+                _, self.hist_edges = np.histogram(x[valid], bins=HISTOGRAM_BINS)
+                bins = np.clip(
+                    np.searchsorted(self.hist_edges, x[valid], side="right") - 1,
+                    0, HISTOGRAM_BINS - 1,
+                )
+                flat = inverse[valid] * HISTOGRAM_BINS + bins
+                self.hist_counts = np.bincount(
+                    flat, minlength=n_cells * HISTOGRAM_BINS
+                ).reshape(n_cells, HISTOGRAM_BINS)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.cell_codes, self.rows, *self.count.values(), *self.sum.values(), *self.sumsq.values()]
+        if self.hist_counts is not None:
+            arrays += [self.hist_edges, self.hist_counts]
+        return sum(a.nbytes for a in arrays)
+
+    def _cell_mask(self, filters: dict):
+        """Boolean mask over cells, or None if the filters can't be answered here."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        for key, val in (filters or {}).items():
+            if is_noop_filter(val):
+                continue
+            if key not in self.dims or isinstance(val, dict):
+                return None
+
+            values = val if isinstance(val, (list, tuple)) else [val]
+            lookup = {v: i for i, v in enumerate(self.categories[key])}
+            codes = [lookup[v] for v in values if v in lookup]
+            mask &= np.isin(self.cell_codes[:, self.dims.index(key)], codes)
+        return mask
+
+    def query(self, filters: dict):
+        """
+        Profile-shaped aggregates for the rows matching `filters`, or None
+        when they need row-level evaluation (ranges, non-dimension columns,
+        or a bar-chart column that isn't a dimension).
+        """
+        if self.categorical and self.categorical[0] not in self.dims:
+            return None
+
+        cells = self._cell_mask(filters)
+        if cells is None:
+            return None
+
+        columns = {}
+        for col in self.numeric:
+            n = float(self.count[col][cells].sum())
+            total = float(self.sum[col][cells].sum())
+            total_sq = float(self.sumsq[col][cells].sum())
+            mean = total / n if n else None
+            variance = (total_sq - n * mean * mean) / (n - 1) if n > 1 else None
+            columns[col] = {
+                "count": int(n),
+                "mean": mean,
+                "variance": None if variance is None else max(variance, 0.0),
+                "histogram": {"edges": [], "counts": []},
+            }
+
+        if self.hist_counts is not None:
+            counts = self.hist_counts[cells].sum(axis=0)
+            if counts.sum() > 0:
+                columns[self.hist_col]["histogram"] = {
+                    "edges": [float(e) for e in self.hist_edges],
+                    "counts": [int(c) for c in counts],
+                }
+
+        for i, col in enumerate(self.dims):
+            cats = self.categories[col]
+            codes = self.cell_codes[cells, i]
+            per_value = np.bincount(codes, weights=self.rows[cells], minlength=len(cats) + 1)[: len(cats)]
+            present = [(cats[k], int(c)) for k, c in enumerate(per_value) if c > 0]
+            present.sort(key=lambda vc: -vc[1])
+            columns[col] = {"distinct": len(present), "top": [[v, c] for v, c in present]}
+
+        return {
+            "rows": int(self.rows[cells].sum()),
+            "numeric_columns": self.numeric,
+            "categorical_columns": list(self.dims),
+            "columns": columns,
+            "correlation": None,
+        }
@@ -1,5 +1,6 @@
 # backend/app/db.py
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .config import get_settings
 
@@ -10,22 +11,69 @@ class Base(DeclarativeBase):
     pass
 
 
+def _pool_options(uri: str) -> dict:
+    # SQLite picks its own pool class; pool sizing only applies to servers.
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+# Sync engine: the ingest worker and plain `def` routes (run in the threadpool).
 engine = create_engine(
     settings.sqlalchemy_database_uri,
     pool_pre_ping=True,
+    **_pool_options(settings.sqlalchemy_database_uri),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: `async def` routes await queries instead of blocking the loop.
+async_engine = create_async_engine(
+    settings.async_database_uri,
+    pool_pre_ping=True,
+    **_pool_options(settings.async_database_uri),
+)
+
+# expire_on_commit=False: attribute access after commit must not trigger
+# implicit (sync) IO on an async session.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
-def init_db():
-    # For now, create tables automatically. Later we'll do proper migrations.
-    from . import models  # noqa
-    Base.metadata.create_all(bind=engine)
-    
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _pool_stats(pool) -> dict:
+    stats = {"class": type(pool).__name__}
+    # QueuePool-style pools report occupancy; SQLite's pools don't.
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    return stats
+
+
+def pool_stats() -> dict:
+    return {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.pool),
+    }
+
+
+async def close_db():
+    await async_engine.dispose()
+    engine.dispose()
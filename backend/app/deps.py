@@ -1,9 +1,2 @@
-from .db import SessionLocal
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+# Session dependencies live in app.db; re-exported for existing imports.
+from .db import get_async_db, get_db  # noqa: F401
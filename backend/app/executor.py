@@ -0,0 +1,219 @@
+# backend/app/executor.py
+"""
+Dedicated executors for blocking analytics work, so async routes never run
+pandas/Plotly/blob/OpenAI calls on the event loop.
+
+- CPU pool: thread or process pool (ANALYTICS_EXECUTOR = "thread" | "process").
+  Process mode sidesteps the GIL for pandas/Plotly work, at the cost of
+  per-process DataFrame caches.
+- I/O pool: threads for blob / HTTP calls.
+
+Each tenant may run at most TENANT_MAX_CONCURRENCY jobs and queue at most
+TENANT_MAX_QUEUED more; beyond that callers get a 429.
+"""
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class AnalyticsExecutor:
+    def __init__(
+        self,
+        kind: str,
+        cpu_workers: int,
+        io_workers: int,
+        tenant_max_concurrency: int,
+        tenant_max_queued: int,
+    ):
+        self.kind = kind
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.tenant_max_queued = tenant_max_queued
+
+        self._cpu_pool: Executor | None = None
+        self._io_pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+        self._tenant_slots: dict[str, asyncio.Semaphore] = {}
+        self._queued = defaultdict(int)
+        self._running = defaultdict(int)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # Pools are created lazily so importing this module never forks/spawns.
+    def _get_cpu_pool(self) -> Executor:
+        with self._pool_lock:
+            if self._cpu_pool is None:
+                if self.kind == "process":
+                    self._cpu_pool = ProcessPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._cpu_pool = ThreadPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        thread_name_prefix="analytics",
+                    )
+            return self._cpu_pool
+
+    def _get_io_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._io_pool is None:
+                self._io_pool = ThreadPoolExecutor(
+                    max_workers=self.io_workers,
+                    thread_name_prefix="analytics-io",
+                )
+            return self._io_pool
+
+    def warm_up(self) -> None:
+        """Create both pools now instead of on the first request."""
+        self._get_cpu_pool()
+        self._get_io_pool()
+
+    async def _run(self, pool: Executor, tenant_id: str, fn, *args, **kwargs):
+        tenant_id = str(tenant_id)
+        if self._queued[tenant_id] >= self.tenant_max_queued:
+            self.rejected += 1
+            raise HTTPException(429, "Too many analytics requests in progress for this tenant")
+
+        slots = self._tenant_slots.setdefault(
+            tenant_id, asyncio.Semaphore(self.tenant_max_concurrency)
+        )
+
+        self._queued[tenant_id] += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._queued[tenant_id] -= 1
+
+        self._running[tenant_id] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._running[tenant_id] -= 1
+            slots.release()
+
+    async def run_cpu(self, tenant_id: str, fn, *args, **kwargs):
+        """Run CPU-bound work (pandas / Plotly). `fn` must be picklable in process mode."""
+        return await self._run(self._get_cpu_pool(), tenant_id, fn, *args, **kwargs)
+
+    async def run_io(self, tenant_id: str, fn, *args, **kwargs):
+        """Run blocking I/O (blob downloads, HTTP calls) on the I/O thread pool."""
+        return await self._run(self._get_io_pool(), tenant_id, fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "cpu_workers": self.cpu_workers,
+            "io_workers": self.io_workers,
+            "queued": sum(self._queued.values()),
+            "running": sum(self._running.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            # Aggregates only: tenant ids are not exposed.
+            "active_tenants": sum(
+                1 for t in set(self._queued) | set(self._running)
+                if self._queued[t] or self._running[t]
+            ),
+            "max_tenant_queued": max(self._queued.values(), default=0),
+            "max_tenant_running": max(self._running.values(), default=0),
+        }
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            for pool in (self._cpu_pool, self._io_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._cpu_pool = None
+            self._io_pool = None
+
+
+class TaskStore:
+    """
+    Memoizes background results per key. Each entry is an asyncio.Task on the
+    app's event loop; finished entries are kept in LRU order up to
+    `max_entries`. Failed computations are dropped so the next request retries.
+    An optional `owner` is recorded per key; `wait` with a different owner
+    behaves as if the key were unknown.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._tasks: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self._owners: dict[str, object] = {}
+
+    def start(
+        self, key: str, compute: Callable[[], Awaitable], force: bool = False, owner=None
+    ) -> asyncio.Task:
+        task = self._tasks.get(key)
+        if task is not None and not force:
+            if not (task.done() and (task.cancelled() or task.exception() is not None)):
+                self._tasks.move_to_end(key)
+                return task
+
+        task = asyncio.ensure_future(compute())
+        self._tasks[key] = task
+        self._tasks.move_to_end(key)
+        if owner is not None:
+            self._owners[key] = owner
+        self._evict()
+        return task
+
+    def _evict(self) -> None:
+        while len(self._tasks) > self.max_entries:
+            # Never drop a computation that is still running.
+            oldest = next((k for k, t in self._tasks.items() if t.done()), None)
+            if oldest is None:
+                return
+            del self._tasks[oldest]
+            self._owners.pop(oldest, None)
+
+    def status(self, key: str) -> dict | None:
+        task = self._tasks.get(key)
+        if task is None:
+            return None
+        if not task.done():
+            return {"id": key, "status": "pending", "result": None}
+        if task.cancelled() or task.exception() is not None:
+            return {"id": key, "status": "failed", "result": None}
+        return {"id": key, "status": "ready", "result": task.result()}
+
+    async def wait(self, key: str, timeout: float, owner=None) -> dict | None:
+        task = self._tasks.get(key)
+        if task is None or (owner is not None and self._owners.get(key) != owner):
+            return None
+        if timeout > 0:
+            await asyncio.wait({task}, timeout=timeout)
+        return self.status(key)
+
+    def stats(self) -> dict:
+        pending = sum(1 for t in self._tasks.values() if not t.done())
+        return {"entries": len(self._tasks), "pending": pending}
+
+
+analytics_executor = AnalyticsExecutor(
+    kind=settings.ANALYTICS_EXECUTOR,
+    cpu_workers=settings.ANALYTICS_WORKERS,
+    io_workers=settings.ANALYTICS_IO_WORKERS,
+    tenant_max_concurrency=settings.TENANT_MAX_CONCURRENCY,
+    tenant_max_queued=settings.TENANT_MAX_QUEUED,
+)
@@ -0,0 +1,147 @@
+# backend/app/filter_index.py
+"""
+Bitmap index for dashboard filters.
+
+Low-cardinality text columns (the ones offered as filter dropdowns) are
+stored as categoricals, and each value gets a packed row bitmap built once
+per cached dataset. A filter request ANDs bitmaps and takes rows once
+instead of materializing a new frame per filter key.
+
+Supported filter values:
+  - scalar            -> equality
+  - list / tuple      -> any of the values (isin)
+  - {"min":, "max":}  -> inclusive range (either bound optional); numeric,
+                         or dates on datetime columns
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+# Columns with at most this many distinct values are offered as filters.
+MAX_FILTER_VALUES = 50
+
+
+def is_noop_filter(val) -> bool:
+    if isinstance(val, (list, tuple)):
+        return len(val) == 0
+    if isinstance(val, dict):
+        return val.get("min") in (None, "") and val.get("max") in (None, "")
+    return val in (None, "", "all")
+
+
+def categorize_low_cardinality(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert text columns with <= MAX_FILTER_VALUES distinct values to category dtype."""
+    converted = {}
+    for col in df.select_dtypes(include=["object"]).columns:
+        if df[col].nunique(dropna=True) <= MAX_FILTER_VALUES:
+            converted[col] = df[col].astype("category")
+    return df.assign(**converted) if converted else df
+
+
+class FilterIndex:
+    """Packed per-value row bitmaps for the categorical columns of one DataFrame."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self.n_rows = len(df)
+        self._bitmaps: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._nbytes = 0
+
+    def covers(self, col: str) -> bool:
+        # High-cardinality categories aren't offered as filters; a bitmap per
+        # value would cost more than scanning the column.
+        dtype = self._df[col].dtype
+        return isinstance(dtype, pd.CategoricalDtype) and len(dtype.categories) <= MAX_FILTER_VALUES
+
+    def _column_bitmaps(self, col: str) -> dict:
+        # Built lazily per column, then shared by every request on this dataset.
+        bitmaps = self._bitmaps.get(col)
+        if bitmaps is not None:
+            return bitmaps
+
+        with self._lock:
+            bitmaps = self._bitmaps.get(col)
+            if bitmaps is None:
+                s = self._df[col]
+                codes = s.cat.codes.to_numpy()
+                bitmaps = {
+                    value: np.packbits(codes == code)
+                    for code, value in enumerate(s.cat.categories)
+                }
+                self._bitmaps[col] = bitmaps
+                self._nbytes += sum(b.nbytes for b in bitmaps.values())
+        return bitmaps
+
+    def bitmap(self, col: str, values) -> np.ndarray:
+        bitmaps = self._column_bitmaps(col)
+        out = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for v in values:
+            hit = bitmaps.get(v)
+            if hit is not None:
+                out |= hit
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        # Kept as a running total so readers never iterate `_bitmaps` while
+        # another request is adding a column to it.
+        return self._nbytes
+
+
+def _range_bound(s: pd.Series, key: str, bound):
+    """A range bound comparable with `s`; 400 if it can't be parsed."""
+    try:
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            ts = pd.to_datetime(bound)
+            tz = getattr(s.dtype, "tz", None)
+            if tz is not None and ts.tzinfo is None:
+                ts = ts.tz_localize(tz)
+            elif tz is None and ts.tzinfo is not None:
+                ts = ts.tz_convert(None)
+            return ts
+        return float(bound)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, f"Invalid {key} bound for range filter: {bound!r}") from e
+
+
+def _column_mask(s: pd.Series, val) -> np.ndarray:
+    if isinstance(val, dict):
+        col = s if pd.api.types.is_datetime64_any_dtype(s.dtype) else pd.to_numeric(s, errors="coerce")
+        mask = col.notna()
+        if val.get("min") not in (None, ""):
+            mask &= col >= _range_bound(s, "min", val["min"])
+        if val.get("max") not in (None, ""):
+            mask &= col <= _range_bound(s, "max", val["max"])
+        return mask.to_numpy(dtype=bool)
+    if isinstance(val, (list, tuple)):
+        return s.isin(list(val)).to_numpy(dtype=bool)
+    return (s == val).to_numpy(dtype=bool)
+
+
+def filter_mask(df: pd.DataFrame, filters: dict, index: FilterIndex | None = None):
+    """
+    Combined packed row mask for `filters`, or None when no filter applies.
+    Equality / isin on indexed columns use bitmaps; everything else is
+    evaluated on the column and packed.
+    """
+    mask = None
+    for key, val in (filters or {}).items():
+        if key not in df.columns or is_noop_filter(val):
+            continue
+
+        if index is not None and not isinstance(val, dict) and index.covers(key):
+            values = val if isinstance(val, (list, tuple)) else [val]
+            bits = index.bitmap(key, values)
+        else:
+            bits = np.packbits(_column_mask(df[key], val))
+
+        mask = bits if mask is None else mask & bits
+    return mask
+
+
+def take_rows(df: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    rows = np.unpackbits(mask, count=len(df)).astype(bool)
+    return df[rows]
@@ -1,21 +1,45 @@
+import contextlib
 import io
-import os
 import json
-import math
+import logging
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.figure_factory as ff
-from openai import OpenAI
+import pyarrow as pa
+import pyarrow.parquet as pq
 from fastapi import HTTPException
-from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceNotFoundError
 from app.config import get_settings
+from app.cube import AggregateCube
+from app.filter_index import (
+    MAX_FILTER_VALUES,
+    FilterIndex,
+    categorize_low_cardinality,
+    filter_mask,
+    is_noop_filter,
+    take_rows,
+)
+from app.profiling import (
+    HISTOGRAM_BINS,
+    ProfileAggregator,
+    build_profile,
+    categorical_columns,
+    load_profile,
+    numeric_columns,
+    write_profile,
+)
+from app.sampling import Sample, StratifiedReservoir
+from app.schema import apply_schema, infer_types, load_schema, schema_of, write_schema
+from app.storage import artifact_path, get_container_client, open_blob_stream
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 # -------------------------
-# Helpers: make payload JSON-safe
+# Helpers
 # -------------------------
 def _clean_df(df: pd.DataFrame) -> pd.DataFrame:
     df = df.replace([np.inf, -np.inf], np.nan)
@@ -30,79 +54,472 @@ def _clean_df(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _json_safe(obj):
+def _type_df(df: pd.DataFrame, schema: dict = None) -> pd.DataFrame:
+    # Compact dtypes: reuse the stored schema when we have one, else infer
+    return apply_schema(df, schema) if schema else infer_types(df)
+
+
+@contextlib.contextmanager
+def timed_stage(timings: dict | None, name: str):
+    """Record the wall time of an ingest stage (seconds) into `timings`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+
+# -------------------------
+# Parse raw uploads
+# -------------------------
+def _is_excel(blob_path: str) -> bool:
+    return blob_path.lower().endswith((".xlsx", ".xls"))
+
+
+def _read_raw(fh, blob_path: str, sheet: int = 0) -> pd.DataFrame:
+    path = blob_path.lower()
+
+    if path.endswith(".csv"):
+        # More resilient CSV read (encoding surprises are common)
+        try:
+            df = pd.read_csv(fh)
+        except UnicodeDecodeError:
+            fh.seek(0)
+            df = pd.read_csv(fh, encoding="latin-1")
+    elif _is_excel(path):
+        df = pd.read_excel(fh, sheet_name=sheet)
+    else:
+        raise HTTPException(400, "Unsupported file type")
+
+    return df
+
+
+def parse_file(fh, blob_path: str, schema: dict = None, sheet: int = 0) -> pd.DataFrame:
     """
-    Recursively convert NaN/Inf to None so FastAPI's JSON encoding never fails.
-    (Starlette JSONResponse is strict and will throw on NaN/Inf.)
+    Parse a seekable binary file object holding a raw CSV/Excel upload.
+    Column types come from `schema` when given (see app.schema), else are inferred.
+    For workbooks only sheet number `sheet` is read (.xlsx via openpyxl's
+    read-only, row-streaming mode).
     """
-    if isinstance(obj, float):
-        return None if (math.isnan(obj) or math.isinf(obj)) else obj
-    if isinstance(obj, (np.floating,)):
-        v = float(obj)
-        return None if (math.isnan(v) or math.isinf(v)) else v
-    if isinstance(obj, dict):
-        return {k: _json_safe(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_json_safe(v) for v in obj]
-    return obj
+    return _type_df(_clean_df(_read_raw(fh, blob_path, sheet)), schema)
+
+
+def _clean_chunk(df: pd.DataFrame, schema: dict = None) -> pd.DataFrame:
+    # Like _clean_df, but never drops columns or infers types per chunk, so
+    # every chunk keeps the same columns and (given a schema) the same dtypes.
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df.dropna(how="all")
+    df.columns = [str(c).strip() for c in df.columns]
+    return apply_schema(df, schema) if schema else df
+
+
+def _iter_csv(open_fh, chunk_rows: int, schema: dict = None):
+    # `open_fh()` returns a context manager yielding a fresh binary stream.
+    yielded = 0
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            with open_fh() as fh:
+                for i, chunk in enumerate(pd.read_csv(fh, chunksize=chunk_rows, encoding=encoding)):
+                    if i < yielded:
+                        continue
+                    yield _clean_chunk(chunk, schema)
+                    yielded += 1
+            return
+        except UnicodeDecodeError:
+            if encoding == "latin-1":
+                raise
+
+
+def iter_csv_chunks(container, blob_path: str, chunk_rows: int, schema: dict = None):
+    """
+    Stream a CSV blob as cleaned DataFrame chunks without holding the file in
+    memory. Falls back to latin-1 like parse_file, skipping chunks that were
+    already yielded before the decode error.
+    """
+    return _iter_csv(lambda: open_blob_stream(container, blob_path), chunk_rows, schema)
+
+
+def _rewound(fh):
+    fh.seek(0)
+    return contextlib.nullcontext(fh)
+
+
+def _is_large_csv(blob_path: str, size: int) -> bool:
+    return blob_path.lower().endswith(".csv") and size > settings.STREAMING_THRESHOLD_BYTES
 
 
 # -------------------------
-# AI Summary
+# Columnar (Parquet) copy next to the raw blob
 # -------------------------
-def generate_ai_summary(df: pd.DataFrame) -> str:
-    API_KEY = os.getenv("OPENAI_API_KEY")
-    if not API_KEY:
-        return "AI summary unavailable (missing OPENAI_API_KEY)."
+def columnar_path(blob_path: str, sheet: int = 0) -> str:
+    # Sheet 0 (the only one for CSVs) keeps the original layout.
+    return artifact_path(blob_path, f"columnar/sheet_{sheet}.parquet" if sheet else "columnar/data.parquet")
+
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    # Messy Excel columns often mix numbers and text; Arrow needs one type per column.
+    df = df.copy()
+    for col in df.select_dtypes(include=["object"]).columns:
+        kind = pd.api.types.infer_dtype(df[col], skipna=True)
+        if kind not in ("string", "empty"):
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
 
-    try:
-        client = OpenAI(api_key=API_KEY)
 
-        sample = df.head(20).to_csv(index=False)
-        prompt = f"""
-You are a data analyst. Explain the main patterns in the dataset below.
-Dataset sample:
-{sample}
-"""
+def write_columnar_copy(container, blob_path: str, df: pd.DataFrame, sheet: int = 0) -> str:
+    """
+    Store the parsed + cleaned upload as Parquet, so insights requests never
+    have to re-parse CSV/Excel.
+    """
+    df = _arrow_safe(df)
+
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
 
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return response.choices[0].message.content
+    target = columnar_path(blob_path, sheet)
+    container.get_blob_client(target).upload_blob(buf.getvalue(), overwrite=True)
+    return target
 
-    except Exception as e:
-        return f"AI summary unavailable: {type(e).__name__}"
+
+# -------------------------
+# Stored stratified sample (very large CSVs)
+# -------------------------
+_WEIGHT_COL = "__sample_weight"
+_STRATUM_COL = "__sample_stratum"
+_SAMPLE_META_KEY = b"beam_sample"
+
+
+def sample_path(blob_path: str) -> str:
+    return artifact_path(blob_path, "sample/sample.parquet")
 
 
+def _blob_version(props) -> str:
+    return props.etag or str(props.last_modified)
+
+
+def write_sample(container, blob_path: str, sample: Sample, version: str) -> str:
+    """
+    Store a reservoir sample as Parquet, tagged with the raw blob version it
+    was drawn from; weights and strata travel as extra columns.
+    """
+    df = _arrow_safe(sample.df).assign(**{_WEIGHT_COL: sample.weights, _STRATUM_COL: sample.strata})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {
+        "version": version,
+        "strata_col": sample.strata_col,
+        "population": [int(n) for n in sample.population.values()],
+        "sizes": [int(n) for n in sample.sizes.values()],
+    }
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), _SAMPLE_META_KEY: json.dumps(meta).encode("utf-8")}
+    )
+
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+
+    target = sample_path(blob_path)
+    container.get_blob_client(target).upload_blob(buf.getvalue(), overwrite=True)
+    return target
+
+
+def _read_sample(data: bytes) -> tuple[Sample, str]:
+    table = pq.read_table(io.BytesIO(data))
+    meta = json.loads(table.schema.metadata[_SAMPLE_META_KEY])
+    df = table.to_pandas()
+    weights = df.pop(_WEIGHT_COL).to_numpy(dtype="float64")
+    strata = df.pop(_STRATUM_COL).to_numpy(dtype="int64")
+    sample = Sample(
+        df,
+        weights,
+        strata,
+        dict(enumerate(meta["population"])),
+        dict(enumerate(meta["sizes"])),
+        meta["strata_col"],
+    )
+    return sample, meta["version"]
+
+
+def _sheet_artifacts(container, blob_path: str, raw: pd.DataFrame, sheet: int = 0, timings: dict = None) -> dict:
+    with timed_stage(timings, "clean"):
+        df = _clean_df(raw)
+    with timed_stage(timings, "type"):
+        df = _type_df(df)
+    with timed_stage(timings, "profile"):
+        profile = write_profile(container, blob_path, build_profile(df), sheet)
+    with timed_stage(timings, "columnar"):
+        columnar = write_columnar_copy(container, blob_path, df, sheet)
+        schema = write_schema(container, blob_path, schema_of(df), sheet)
+    return {"columnar_path": columnar, "profile_path": profile, "schema_path": schema}
+
+
+def build_artifacts(container, blob_path: str, fh, timings: dict = None, version: str = None) -> dict:
+    """
+    Ingest-time work for a new upload: parse, clean and type once, then write
+    the statistical profile and the Parquet copy. Returns the artifact blob
+    paths; per-stage seconds are recorded into `timings` when given.
+
+    Large CSVs are only profiled, chunk by chunk; they are never loaded whole,
+    so a Parquet copy would not help them. CSVs above the sampling threshold
+    also get their stratified sample drawn in the same pass, tagged with
+    `version` (the raw blob's ETag; looked up when not given). For workbooks
+    only the first sheet is converted here; "sheets" lists every sheet name
+    so the rest can be handed to build_sheet_artifacts.
+    """
+    size = fh.seek(0, io.SEEK_END)
+    fh.seek(0)
+    if _is_large_csv(blob_path, size):
+        reservoir = StratifiedReservoir(settings.SAMPLE_ROWS) if size > settings.SAMPLING_THRESHOLD_BYTES else None
+        # Types are inferred from the first chunk and applied to the rest;
+        # numbers keep 64-bit width since later chunks may exceed its range.
+        with timed_stage(timings, "profile"):
+            agg = ProfileAggregator(drop_empty_columns=True)
+            schema = None
+            for chunk in _iter_csv(lambda: _rewound(fh), settings.CSV_CHUNK_ROWS):
+                if schema is None:
+                    schema = schema_of(infer_types(chunk, downcast=False))
+                chunk = apply_schema(chunk, schema)
+                agg.add(chunk)
+                if reservoir is not None:
+                    reservoir.add(chunk)
+            artifacts = {
+                "columnar_path": None,
+                "profile_path": write_profile(container, blob_path, agg.result()),
+                "schema_path": write_schema(container, blob_path, schema) if schema else None,
+            }
+        if reservoir is not None:
+            with timed_stage(timings, "sample"):
+                if version is None:
+                    version = _blob_version(container.get_blob_client(blob_path).get_blob_properties())
+                artifacts["sample_path"] = write_sample(container, blob_path, reservoir.result(), version)
+        return artifacts
+
+    if _is_excel(blob_path):
+        with timed_stage(timings, "parse"):
+            with pd.ExcelFile(fh) as book:
+                sheets = [str(name) for name in book.sheet_names]
+                raw = book.parse(0)
+        return {**_sheet_artifacts(container, blob_path, raw, 0, timings), "sheets": sheets}
+
+    with timed_stage(timings, "parse"):
+        raw = _read_raw(fh, blob_path)
+    return _sheet_artifacts(container, blob_path, raw, 0, timings)
+
+
+def build_sheet_artifacts(container, blob_path: str, sheets, fh=None) -> None:
+    """
+    Convert the given workbook sheets (by number) to their own artifacts,
+    reading the raw workbook from `fh` or else from the blob.
+    """
+    if fh is None:
+        fh = io.BytesIO(container.get_blob_client(blob_path).download_blob().readall())
+    fh.seek(0)
+    with pd.ExcelFile(fh) as book:
+        for sheet in sheets:
+            try:
+                _sheet_artifacts(container, blob_path, book.parse(sheet), sheet)
+            except Exception:
+                # Insights for this sheet fall back to reading it from the raw blob.
+                logger.exception("Sheet %s conversion failed for %s", sheet, blob_path)
+
+
+def _read_columnar(data: bytes) -> pd.DataFrame:
+    return pd.read_parquet(io.BytesIO(data))
+
+
+# -------------------------
+# In-process DataFrame cache
+# -------------------------
+class Dataset:
+    """A cached, cleaned DataFrame plus the lookup structures built from it."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._index = None
+        self._cube = None
+        self._df_nbytes = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> FilterIndex:
+        if self._index is None:
+            self._index = FilterIndex(self.df)
+        return self._index
+
+    @property
+    def cube(self) -> AggregateCube:
+        # One pass over the rows, shared by every later filter combination.
+        if self._cube is None:
+            with self._lock:
+                if self._cube is None:
+                    self._cube = AggregateCube(self.df)
+        return self._cube
+
+    @property
+    def nbytes(self) -> int:
+        """Deep size of the frame plus whatever index / cube has been built so far."""
+        if self._df_nbytes is None:
+            self._df_nbytes = int(self.df.memory_usage(deep=True).sum())
+        total = self._df_nbytes
+        if self._index is not None:
+            total += self._index.nbytes
+        if self._cube is not None:
+            total += self._cube.nbytes
+        return total
+
+
+class DataFrameCache:
+    """
+    LRU cache of cleaned Datasets keyed by (blob_path, sheet, blob version).
+    Bounded by total memory (frame plus its filter index and cube) rather than
+    entry count. The index and cube are built lazily after insertion, so an
+    entry is re-measured whenever it is accessed again.
+    Cached frames are shared between requests: treat them as read-only.
+    The stored samples of very large CSVs are kept here too, under
+    (blob_path, "sample", blob version).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple[Dataset, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remeasure(self, key: tuple) -> None:
+        dataset, old_bytes = self._entries[key]
+        nbytes = dataset.nbytes
+        self._entries[key] = (dataset, nbytes)
+        self.current_bytes += nbytes - old_bytes
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+            self.evictions += 1
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._remeasure(key)
+            self._evict()
+            return entry[0]
+
+    def put(self, key: tuple, dataset: Dataset) -> None:
+        nbytes = dataset.nbytes
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            self._entries[key] = (dataset, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def contains(self, key: tuple) -> bool:
+        # Membership check that doesn't touch LRU order or hit/miss counters.
+        with self._lock:
+            return key in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+dataframe_cache = DataFrameCache(settings.DATAFRAME_CACHE_MAX_BYTES)
+
+
+# Raw uploads are uuid-named and never rewritten, and a Parquet copy is final
+# once written, so a resolved source is remembered instead of re-checked with
+# blob HEAD requests on every load.
+RESOLVED_SOURCES_MAX_ENTRIES = 10_000
+_resolved_sources: "OrderedDict[tuple, tuple[str, str]]" = OrderedDict()
+_resolved_lock = threading.Lock()
+
+
+def _resolve_source(container, blob_path: str, sheet: int = 0):
+    """
+    Pick the Parquet copy (of `sheet`) if it exists, else the raw blob.
+    Returns (path, version) where version is the blob ETag (or last-modified).
+    """
+    key = (blob_path, sheet)
+    with _resolved_lock:
+        if key in _resolved_sources:
+            _resolved_sources.move_to_end(key)
+            return _resolved_sources[key]
+
+    for path in (columnar_path(blob_path, sheet), blob_path):
+        try:
+            props = container.get_blob_client(path).get_blob_properties()
+        except ResourceNotFoundError:
+            continue
+        resolved = path, _blob_version(props)
+        # Later sheets of a workbook get their Parquet copy after the file is
+        # ready, so a raw fallback for them is re-checked next time.
+        if path != blob_path or sheet == 0:
+            with _resolved_lock:
+                _resolved_sources[key] = resolved
+                while len(_resolved_sources) > RESOLVED_SOURCES_MAX_ENTRIES:
+                    _resolved_sources.popitem(last=False)
+        return resolved
+
+    raise HTTPException(404, "File content not found in storage")
+
 
 # -------------------------
 # Load file from Azure Blob
 # -------------------------
-def load_file_from_blob(blob_path: str) -> pd.DataFrame:
+def load_dataset(blob_path: str, sheet: int = 0) -> Dataset:
+    """
+    Prefer the Parquet copy written at upload time; fall back to parsing the
+    raw CSV/Excel blob (only `sheet` of a workbook). Results are served from
+    `dataframe_cache` while the blob is unchanged.
+
+    Every column is loaded: the filter index, cube and profile aggregators
+    work over the whole frame, so there is nothing to project away.
+    """
     try:
-        blob_service = BlobServiceClient.from_connection_string(
-            settings.AZURE_BLOB_CONNSTRING
-        )
-        container = blob_service.get_container_client(settings.BLOB_CONTAINER)
+        container = get_container_client()
+        source, version = _resolve_source(container, blob_path, sheet)
 
-        blob = container.get_blob_client(blob_path)
-        data = blob.download_blob().readall()
+        key = (blob_path, sheet, version)
+        dataset = dataframe_cache.get(key)
+        if dataset is not None:
+            return dataset
 
-        path = blob_path.lower()
+        data = container.get_blob_client(source).download_blob().readall()
 
-        if path.endswith(".csv"):
-            # More resilient CSV read (encoding surprises are common)
-            try:
-                df = pd.read_csv(io.BytesIO(data))
-            except UnicodeDecodeError:
-                df = pd.read_csv(io.BytesIO(data), encoding="latin-1")
-        elif path.endswith(".xlsx") or path.endswith(".xls"):
-            df = pd.read_excel(io.BytesIO(data))
+        if source == blob_path:
+            schema = load_schema(container, blob_path, sheet)
+            df = parse_file(io.BytesIO(data), blob_path, schema, sheet)
         else:
-            raise HTTPException(400, "Unsupported file type")
+            df = _read_columnar(data)
 
-        return _clean_df(df)
+        dataset = Dataset(categorize_low_cardinality(df))
+        dataframe_cache.put(key, dataset)
+        return dataset
 
     except HTTPException:
         raise
@@ -110,66 +527,83 @@ def load_file_from_blob(blob_path: str) -> pd.DataFrame:
         raise HTTPException(500, f"Blob load failed: {e}")
 
 
-# -------------------------
-# Compute KPIs
-# -------------------------
-def compute_kpis(df: pd.DataFrame) -> dict:
-    kpis = {"Total Rows": int(len(df))}
-
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        mean_val = df[col].mean(skipna=True)
-        kpis[f"Average {col}"] = None if pd.isna(mean_val) else round(float(mean_val), 2)
-
-    return kpis
-
-
 # -------------------------
 # Build Chart Objects
 # -------------------------
-def safe_fig(fig):
-    # This yields a dict with lots of numbers; we will sanitize later.
-    return json.loads(fig.to_json())
+# Charts are emitted as compact Plotly-compatible {"data", "layout"} dicts built
+# from pre-computed aggregates (bin edges + counts, grouped counts), so the
+# payload size does not grow with the number of rows.
+def _layout(title: str = None, x_title: str = None, y_title: str = None, **extra) -> dict:
+    layout = {}
+    if title is not None:
+        layout["title"] = {"text": title}
+    if x_title is not None:
+        layout["xaxis"] = {"title": {"text": x_title}}
+    if y_title is not None:
+        layout["yaxis"] = {"title": {"text": y_title}}
+    layout.update(extra)
+    return layout
+
+
+def histogram_figure(col: str, edges, counts) -> dict:
+    edges = np.asarray(edges, dtype="float64")
+    return {
+        "data": [{
+            "type": "bar",
+            "name": col,
+            "x": (edges[:-1] + edges[1:]) / 2,
+            "y": np.asarray(counts, dtype=np.int64),
+            "width": np.diff(edges),
+        }],
+        "layout": _layout(f"Distribution of {col}", col, "count", bargap=0),
+    }
 
 
-def build_charts(df: pd.DataFrame) -> dict:
-    charts = {}
+def bar_figure(col: str, labels, counts) -> dict:
+    return {
+        "data": [{
+            "type": "bar",
+            "x": [str(v) for v in labels],
+            "y": np.asarray(counts, dtype=np.int64),
+        }],
+        "layout": _layout(f"{col} Counts", col, "count"),
+    }
 
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    cat_cols = df.select_dtypes(include=["object"]).columns
 
-    # Histogram (drop NaNs to prevent NaNs from propagating into plotly JSON)
-    if len(numeric_cols) > 0:
-        col = numeric_cols[0]
-        dff = df.dropna(subset=[col])
-        if len(dff) > 0:
-            fig = px.histogram(dff, x=col, title=f"Distribution of {col}")
-            charts["histogram"] = safe_fig(fig)
+def heatmap_figure(columns, matrix) -> dict:
+    columns = [str(c) for c in columns]
+    z = np.array(matrix, dtype="float64")
+    annotations = [
+        {
+            "x": columns[j],
+            "y": columns[i],
+            "text": "" if np.isnan(z[i, j]) else f"{z[i, j]:.2f}",
+            "showarrow": False,
+        }
+        for i in range(len(columns))
+        for j in range(len(columns))
+    ]
+    return {
+        "data": [{
+            "type": "heatmap",
+            "z": z,
+            "x": columns,
+            "y": columns,
+            "colorscale": "Viridis",
+            "showscale": True,
+        }],
+        "layout": _layout(annotations=annotations),
+    }
 
-    # Bar chart
-    if len(cat_cols) > 0:
-        col = cat_cols[0]
-        counts = df[col].dropna().value_counts().reset_index()
-        counts.columns = [col, "count"]
-        if len(counts) > 0:
-            fig = px.bar(counts, x=col, y="count", title=f"{col} Counts")
-            charts["bar_chart"] = safe_fig(fig)
-
-    # Correlation heatmap
-    if len(numeric_cols) >= 2:
-        dff = df[list(numeric_cols)].dropna()
-        if len(dff) > 1:
-            corr = dff.corr()
-            fig = ff.create_annotated_heatmap(
-                z=corr.to_numpy(),
-                x=list(corr.columns),
-                y=list(corr.index),
-                colorscale="Viridis",
-                showscale=True,
-            )
-            charts["correlation_matrix"] = safe_fig(fig)
 
-    return charts
+def correlation_chart(df: pd.DataFrame, numeric_cols) -> dict | None:
+    if len(numeric_cols) < 2:
+        return None
+    dff = df[list(numeric_cols)].dropna()
+    if len(dff) <= 1:
+        return None
+    corr = dff.corr()
+    return heatmap_figure(corr.columns, corr.to_numpy())
 
 
 # -------------------------
@@ -177,60 +611,319 @@ def build_charts(df: pd.DataFrame) -> dict:
 # -------------------------
 def extract_filters(df: pd.DataFrame) -> dict:
     filters = {}
-    cat_cols = df.select_dtypes(include=["object"]).columns
 
-    for col in cat_cols:
+    for col in categorical_columns(df):
         unique_vals = sorted(df[col].dropna().unique().tolist())
-        if len(unique_vals) <= 50:
+        if len(unique_vals) <= MAX_FILTER_VALUES:
             filters[col] = unique_vals
 
     return filters
 
 
 # -------------------------
-# Apply Filters
+# Insights straight from the ingest-time profile
 # -------------------------
-def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
-    filtered_df = df.copy()
+def insights_from_profile(profile: dict) -> dict:
+    columns = profile["columns"]
+    numeric_cols = profile["numeric_columns"]
+    cat_cols = profile["categorical_columns"]
 
-    for key, val in (filters or {}).items():
-        if key not in filtered_df.columns:
-            continue
+    kpis = {"Total Rows": profile["rows"]}
+    for col in numeric_cols:
+        mean_val = columns[col]["mean"]
+        kpis[f"Average {col}"] = None if mean_val is None else round(mean_val, 2)
 
-        # ignore "all"/empty/null
-        if val in [None, "", "all"]:
-            continue
+    charts = {}
+    if numeric_cols:
+        col = numeric_cols[0]
+        hist = columns[col]["histogram"]
+        if hist["counts"]:
+            charts["histogram"] = histogram_figure(col, hist["edges"], hist["counts"])
+
+    if cat_cols:
+        col = cat_cols[0]
+        top = columns[col]["top"]
+        if top:
+            charts["bar_chart"] = bar_figure(col, [v for v, _ in top], [c for _, c in top])
+
+    if profile.get("correlation"):
+        corr = profile["correlation"]
+        charts["correlation_matrix"] = heatmap_figure(corr["columns"], corr["matrix"])
 
-        filtered_df = filtered_df[filtered_df[key] == val]
+    filters = {}
+    for col in cat_cols:
+        entry = columns[col]
+        if entry["distinct"] <= MAX_FILTER_VALUES:
+            filters[col] = sorted(v for v, _ in entry["top"])
 
-    return filtered_df
+    return {"kpis": kpis, "charts": charts, "filters": filters}
 
 
 # -------------------------
-# Full Insights Pipeline
+# Apply Filters
 # -------------------------
-def generate_insights(blob_path: str, filters: dict = None) -> dict:
-    df = load_file_from_blob(blob_path)
+def apply_filters(df: pd.DataFrame, filters: dict, index: FilterIndex = None) -> pd.DataFrame:
+    """
+    Scalar values match exactly, lists match any value, {"min", "max"} is an
+    inclusive range. "all"/empty/null are ignored. With an `index`, categorical
+    filters are answered from its bitmaps; rows are taken once at the end.
+    """
+    mask = filter_mask(df, filters, index)
+    if mask is None:
+        return df
+    return take_rows(df, mask)
 
-    if filters:
-        df = apply_filters(df, filters)
 
-    # Guardrails to prevent huge Plotly payloads / slow responses
-    MAX_ROWS_FOR_CHARTS = 50000
-    df_for_charts = df.head(MAX_ROWS_FOR_CHARTS)
+def _has_active_filters(filters: dict | None) -> bool:
+    return any(not is_noop_filter(v) for v in (filters or {}).values())
+
+
+# -------------------------
+# Streaming / sampling modes for very large files
+# -------------------------
+def _uncached_csv_size(container, blob_path: str, size: int = None) -> int:
+    """Raw size of a CSV that isn't already in memory, else 0."""
+    if not blob_path.lower().endswith(".csv"):
+        return 0
+    if size is None:
+        try:
+            size = container.get_blob_client(blob_path).get_blob_properties().size
+        except ResourceNotFoundError:
+            return 0
 
-    result = {
-        "kpis": compute_kpis(df),
-        "charts": build_charts(df_for_charts),
+    _, version = _resolve_source(container, blob_path)
+    return 0 if dataframe_cache.contains((blob_path, 0, version)) else size
+
+
+def streamed_insights(blob_path: str, filters: dict = None) -> dict:
+    """
+    Exact insights for the rows matching `filters`, aggregated chunk by chunk
+    while streaming the raw CSV; memory is O(columns), not O(rows).
+    """
+    container = get_container_client()
+    agg = ProfileAggregator()
+    schema = load_schema(container, blob_path)
+    for chunk in iter_csv_chunks(container, blob_path, settings.CSV_CHUNK_ROWS, schema):
+        agg.add(apply_filters(chunk, filters))
+    profile = agg.result()
+
+    result = insights_from_profile(profile)
+    result["debug"] = {
+        "version": INSIGHTS_VERSION,
+        "source": "stream",
+        "rows": profile["rows"],
+        "cols": profile["cols"],
+    }
+    return result
+
+
+def head_rows(blob_path: str, filters: dict = None, n: int = 20, sheet: int = 0, size: int = None) -> pd.DataFrame:
+    """
+    The first `n` rows matching `filters`. Large CSVs are streamed and the
+    read stops as soon as enough rows have matched, instead of loading the
+    whole file; `size` is the raw size when the caller already knows it.
+    """
+    if not sheet and size is not None and _is_large_csv(blob_path, size):
+        container = get_container_client()
+        schema = load_schema(container, blob_path)
+        parts, found = [], 0
+        for chunk in iter_csv_chunks(container, blob_path, settings.CSV_CHUNK_ROWS, schema):
+            part = apply_filters(chunk, filters).head(n - found)
+            if len(part):
+                parts.append(part)
+                found += len(part)
+                if found >= n:
+                    break
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    dataset = load_dataset(blob_path, sheet=sheet)
+    return apply_filters(dataset.df, filters, dataset.index).head(n)
+
+
+def load_sample(blob_path: str, strata_col: str = None) -> Sample:
+    """
+    The stratified sample of a very large CSV, drawn once per blob version:
+    stored at ingest, or (for uploads ingested before samples were stored)
+    drawn from one streaming pass on first use and stored then. Served from
+    `dataframe_cache` while the blob is unchanged.
+    """
+    container = get_container_client()
+    _, version = _resolve_source(container, blob_path)
+
+    key = (blob_path, "sample", version)
+    sample = dataframe_cache.get(key)
+    if sample is not None:
+        return sample
+
+    sample = None
+    try:
+        data = container.get_blob_client(sample_path(blob_path)).download_blob().readall()
+        sample, sample_version = _read_sample(data)
+        if sample_version != version:
+            sample = None
+    except ResourceNotFoundError:
+        pass
+
+    if sample is None:
+        reservoir = StratifiedReservoir(settings.SAMPLE_ROWS, strata_col)
+        schema = load_schema(container, blob_path)
+        for chunk in iter_csv_chunks(container, blob_path, settings.CSV_CHUNK_ROWS, schema):
+            reservoir.add(chunk)
+        sample = reservoir.result()
+        write_sample(container, blob_path, sample, version)
+
+    dataframe_cache.put(key, sample)
+    return sample
+
+
+def sampled_insights(blob_path: str, filters: dict = None, strata_col: str = None) -> dict:
+    """
+    KPIs and charts estimated from the stored stratified sample, filtered to
+    the rows matching `filters`. Row counts and means carry 95% intervals.
+    """
+    sample = load_sample(blob_path, strata_col)
+    mask = filter_mask(sample.df, filters)
+    if mask is not None:
+        sample = sample.take(np.unpackbits(mask, count=sample.sample_rows).astype(bool))
+    df = sample.df
+
+    numeric_cols = numeric_columns(df)
+    cat_cols = categorical_columns(df)
+
+    rows, rows_lo, rows_hi = sample.count_ci()
+    rows = int(round(rows))
+    kpis = {"Total Rows": rows}
+    intervals = {"Total Rows": [int(round(rows_lo)), int(round(rows_hi))]}
+    for col in numeric_cols:
+        label = f"Average {col}"
+        mean, lo, hi = sample.mean_ci(col)
+        kpis[label] = None if mean is None else round(mean, 2)
+        if mean is not None:
+            intervals[label] = [round(lo, 2), round(hi, 2)]
+
+    charts = {}
+    if numeric_cols:
+        counts, edges = sample.histogram(numeric_cols[0], HISTOGRAM_BINS)
+        if counts.sum() > 0:
+            charts["histogram"] = histogram_figure(numeric_cols[0], edges, counts)
+    if cat_cols:
+        counts = sample.weighted_counts(cat_cols[0])
+        if len(counts) > 0:
+            charts["bar_chart"] = bar_figure(cat_cols[0], counts.index, counts.to_numpy())
+    corr_fig = correlation_chart(df, numeric_cols)
+    if corr_fig is not None:
+        charts["correlation_matrix"] = corr_fig
+
+    return {
+        "kpis": kpis,
+        "charts": charts,
         "filters": extract_filters(df),
-        "ai_summary": generate_ai_summary(df),
+        "sampling": {
+            "sample_rows": sample.sample_rows,
+            "population_rows": rows,
+            "strata_column": sample.strata_col,
+            "confidence_level": 0.95,
+            "intervals": intervals,
+            "exact": sample.exact,
+        },
         "debug": {
-            "version": "insights_py_2026-01-03_v2",
-            "rows": int(df.shape[0]),
+            "version": INSIGHTS_VERSION,
+            "source": "sample",
+            "rows": rows,
             "cols": int(df.shape[1]),
-            "rows_used_for_charts": int(df_for_charts.shape[0]),
         },
     }
 
-    # Critical: prevent JSONResponse crash on NaN/Infinity anywhere in payload
-    return _json_safe(result)
\ No newline at end of file
+
+# -------------------------
+# Full Insights Pipeline
+# -------------------------
+INSIGHTS_VERSION = "insights_py_2026-10-18_v3"
+
+
+def generate_insights(
+    blob_path: str,
+    filters: dict = None,
+    profile_path: str = None,
+    exact: bool = False,
+    sheet: int = 0,
+    size: int = None,
+) -> dict:
+    """
+    Serve from the cheapest exact source available (profile, cube, cached
+    rows). Large CSVs are streamed through aggregators instead of loaded, and
+    very large ones are sampled unless `exact` is set. `sheet` selects a
+    workbook sheet by number; `profile_path` must belong to that sheet.
+    `size` is the raw upload size when the caller has it (File.size_bytes).
+    """
+    container = get_container_client()
+    profile = load_profile(container, profile_path) if profile_path else None
+
+    # Unfiltered views are answered from the ingest-time profile, no data load.
+    if profile is not None and not _has_active_filters(filters):
+        result = insights_from_profile(profile)
+        result["debug"] = {
+            "version": INSIGHTS_VERSION,
+            "source": "profile",
+            "rows": profile["rows"],
+            "cols": profile["cols"],
+        }
+        return result
+
+    size = _uncached_csv_size(container, blob_path, size) if not sheet else 0
+    if not exact and size > settings.SAMPLING_THRESHOLD_BYTES:
+        strata_col = None
+        if profile is not None:
+            strata_col = next(
+                (c for c in profile["categorical_columns"]
+                 if profile["columns"][c]["distinct"] <= MAX_FILTER_VALUES),
+                None,
+            )
+        return sampled_insights(blob_path, filters, strata_col)
+    if size > settings.STREAMING_THRESHOLD_BYTES:
+        return streamed_insights(blob_path, filters)
+
+    dataset = load_dataset(blob_path, sheet=sheet)
+
+    # Most filter combinations are answered by summing pre-aggregated cells;
+    # only correlation needs the matching rows.
+    aggregates = dataset.cube.query(filters)
+    if aggregates is not None:
+        result = insights_from_profile(aggregates)
+        numeric_cols = aggregates["numeric_columns"]
+        # Categorical columns left out of the cube (cell budget) still get
+        # their filter values, read from the matching rows.
+        other_cats = [c for c in dataset.cube.categorical if c not in aggregates["categorical_columns"]]
+        if len(numeric_cols) >= 2 or other_cats:
+            df = apply_filters(dataset.df, filters, dataset.index)
+            if other_cats:
+                result["filters"].update(extract_filters(df[other_cats]))
+                result["filters"] = {
+                    c: result["filters"][c] for c in dataset.cube.categorical if c in result["filters"]
+                }
+            if len(numeric_cols) >= 2:
+                corr_fig = correlation_chart(df, numeric_cols)
+                if corr_fig is not None:
+                    result["charts"]["correlation_matrix"] = corr_fig
+        result["debug"] = {
+            "version": INSIGHTS_VERSION,
+            "source": "cube",
+            "rows": aggregates["rows"],
+            "cols": int(dataset.df.shape[1]),
+        }
+        return result
+
+    # Otherwise aggregate the filtered rows with the same aggregators used
+    # for profiles, as a single chunk.
+    df = apply_filters(dataset.df, filters, dataset.index)
+
+    result = insights_from_profile(build_profile(df))
+    result["debug"] = {
+        "version": INSIGHTS_VERSION,
+        "source": "data",
+        "rows": int(df.shape[0]),
+        "cols": int(df.shape[1]),
+    }
+
+    # NaN/Infinity are rendered as null by SafeJSONResponse
+    return result
@@ -0,0 +1,317 @@
+# backend/app/jobs.py
+"""
+Background ingestion pipeline.
+
+Uploads only store the raw blob and enqueue a job; a worker then runs
+download -> parse -> clean -> type -> profile -> columnar (-> other sheets)
+and moves File.status through uploaded -> processing -> ready | failed.
+
+The queue is a small SQLite table, so workers can run inside the API process
+(INGEST_WORKERS threads) or as a separate process sharing the same file:
+
+    python -m app.jobs
+
+Failed jobs are retried up to INGEST_MAX_ATTEMPTS; jobs left "running" by a
+crashed worker are picked up again after INGEST_JOB_TIMEOUT_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError
+
+from app.config import get_settings
+from app.db import SessionLocal
+from app.insights import build_artifacts, build_sheet_artifacts, timed_stage
+from app.models import File
+from app.storage import get_container_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# File.status values
+UPLOADED = "uploaded"
+PROCESSING = "processing"
+READY = "ready"
+FAILED = "failed"
+PENDING_STATUSES = (UPLOADED, PROCESSING)
+
+# Uploads above this are spooled to disk while a job processes them.
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+# -------------------------
+# SQLite-backed job queue
+# -------------------------
+class JobQueue:
+    def __init__(self, path: str, max_attempts: int, timeout_seconds: int):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.timeout_seconds = timeout_seconds
+        self.wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily so importing this module never touches the filesystem.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    blob_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    timings TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_blob ON jobs (blob_path, created_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row(row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["timings"] = json.loads(job["timings"]) if job["timings"] else {}
+        return job
+
+    def enqueue(self, file_id: str, blob_path: str) -> str:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, file_id, blob_path, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, str(file_id), blob_path, time.time()),
+            )
+        self.wakeup.set()
+        return job_id
+
+    def claim(self) -> dict | None:
+        """Atomically take the oldest queued (or timed-out running) job."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND started_at < ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (now - self.timeout_seconds,),
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._row(row)
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: str, timings: dict) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = 'done', error = NULL, timings = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(timings), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, timings: dict, retry: bool) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = ?, error = ?, timings = ?, finished_at = ? WHERE id = ?",
+                ("queued" if retry else "failed", error, json.dumps(timings), time.time(), job_id),
+            )
+        if retry:
+            self.wakeup.set()
+
+    def latest_for(self, blob_path: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM jobs WHERE blob_path = ? ORDER BY created_at DESC LIMIT 1",
+                (blob_path,),
+            ).fetchone()
+        return self._row(row)
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+ingest_queue = JobQueue(
+    settings.INGEST_QUEUE_PATH,
+    max_attempts=settings.INGEST_MAX_ATTEMPTS,
+    timeout_seconds=settings.INGEST_JOB_TIMEOUT_SECONDS,
+)
+
+
+def enqueue_ingest(file: File) -> str:
+    return ingest_queue.enqueue(file.id, file.blob_path)
+
+
+def ensure_ingest(file: File) -> None:
+    """
+    Enqueue pending files with no live job: uploaded before the queue existed,
+    or a duplicate whose status was copied just before the original finished.
+    """
+    if file.status not in PENDING_STATUSES:
+        return
+    job = ingest_queue.latest_for(file.blob_path)
+    if job is None or job["status"] in ("done", "failed"):
+        enqueue_ingest(file)
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+def _update_files(blob_path: str, **fields) -> None:
+    # Deduplicated uploads share one blob, so every File row on it moves together.
+    db = SessionLocal()
+    try:
+        db.query(File).filter(File.blob_path == blob_path).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _expected_etag(blob_path: str) -> str | None:
+    db = SessionLocal()
+    try:
+        return db.query(File.blob_etag).filter(
+            File.blob_path == blob_path, File.blob_etag.isnot(None)
+        ).limit(1).scalar()
+    finally:
+        db.close()
+
+
+def ingest_file(blob_path: str, timings: dict, etag: str | None = None) -> dict:
+    """
+    Build every artifact for one upload. Returns build_artifacts' result plus
+    the content hash (direct-to-blob uploads arrive without one). With an
+    `etag`, the download fails with ResourceModifiedError unless the blob is
+    still that version.
+    """
+    container = get_container_client()
+    digest = hashlib.sha256()
+    conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as fh:
+        with timed_stage(timings, "download"):
+            for chunk in container.get_blob_client(blob_path).download_blob(**conditions).chunks():
+                digest.update(chunk)
+                fh.write(chunk)
+            fh.seek(0)
+
+        artifacts = build_artifacts(container, blob_path, fh, timings, version=etag)
+        artifacts["content_hash"] = digest.hexdigest()
+
+        sheets = artifacts.get("sheets") or []
+        if len(sheets) > 1:
+            with timed_stage(timings, "sheets"):
+                build_sheet_artifacts(container, blob_path, range(1, len(sheets)), fh)
+    return artifacts
+
+
+def run_job(job: dict) -> None:
+    timings: dict = {}
+    _update_files(job["blob_path"], status=PROCESSING)
+
+    start = time.perf_counter()
+    try:
+        artifacts = ingest_file(job["blob_path"], timings, _expected_etag(job["blob_path"]))
+    except Exception as e:
+        timings["total"] = round(time.perf_counter() - start, 3)
+        # A blob rewritten after /upload-complete won't change back; don't retry.
+        retry = job["attempts"] < ingest_queue.max_attempts and not isinstance(e, ResourceModifiedError)
+        logger.exception("Ingest job %s failed (attempt %s)", job["id"], job["attempts"])
+        ingest_queue.fail(job["id"], f"{type(e).__name__}: {e}", timings, retry)
+        if not retry:
+            _update_files(job["blob_path"], status=FAILED)
+        return
+
+    timings["total"] = round(time.perf_counter() - start, 3)
+    sheets = artifacts.get("sheets") or []
+    _update_files(
+        job["blob_path"],
+        status=READY,
+        content_hash=artifacts["content_hash"],
+        profile_path=artifacts.get("profile_path"),
+        sheet_names=json.dumps(sheets) if sheets else None,
+    )
+    ingest_queue.complete(job["id"], timings)
+
+
+# -------------------------
+# Workers
+# -------------------------
+class IngestWorker:
+    def __init__(self, queue: JobQueue, workers: int, poll_seconds: float):
+        self.queue = queue
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except Exception:
+                logger.exception("Ingest queue unavailable")
+                job = None
+            if job is None:
+                self.queue.wakeup.wait(self.poll_seconds)
+                self.queue.wakeup.clear()
+                continue
+            run_job(job)
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"ingest-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self.queue.wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+
+ingest_worker = IngestWorker(ingest_queue, settings.INGEST_WORKERS, settings.INGEST_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    worker = IngestWorker(ingest_queue, max(1, settings.INGEST_WORKERS), settings.INGEST_POLL_SECONDS)
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db import init_db
+from app.auth import admin_required, password_hasher, tenant_cache, user_cache
+from app.db import close_db, pool_stats
+from app.executor import analytics_executor
+from app.insights import dataframe_cache
+from app.jobs import ingest_queue, ingest_worker
+from app.readiness import readiness
+from app.storage import close_storage
+from app.summaries import summary_executor
 from app.routers.auth_routes import router as auth_router
 from app.routers.files import router as files_router
-from app.routers.insights_routes import router as insights_router
+from app.routers.insights_routes import insights_cache, router as insights_router
 
 
 app = FastAPI(
@@ -18,16 +26,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After", "X-Next-Cursor"],
 )
 
+# The schema is managed by Alembic (`alembic upgrade head`, run before
+# deploying); startup only kicks off warm-up, reported by /ready.
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    ingest_worker.start()
+    readiness.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    readiness.stop()
+    ingest_worker.stop()
+    await close_storage()
+    analytics_executor.shutdown()
+    summary_executor.shutdown()
+    password_hasher.shutdown()
+    await close_db()
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", dependencies=[Depends(admin_required)])
+def metrics():
+    return {
+        "dataframe_cache": dataframe_cache.stats(),
+        "analytics_executor": analytics_executor.stats(),
+        "summary_executor": summary_executor.stats(),
+        "ingest_jobs": ingest_queue.stats(),
+        "insights_response_cache": insights_cache.stats(),
+        "auth_cache": {"users": user_cache.stats(), "tenants": tenant_cache.stats()},
+        "password_hasher": password_hasher.stats(),
+        "db_pool": pool_stats(),
+    }
+
 app.include_router(auth_router)
 app.include_router(files_router, prefix="/api/files", tags=["files"])
 app.include_router(insights_router)
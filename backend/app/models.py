@@ -1,9 +1,12 @@
 # backend/app/models.py
 from sqlalchemy import (
-    Column, String, DateTime, ForeignKey, BigInteger, Boolean, Enum
+    CHAR, Column, String, DateTime, ForeignKey, BigInteger, Boolean, Enum, Text, Index, desc
 )
 from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER
-from sqlalchemy.sql import func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TypeDecorator
+import json
 import uuid
 import enum
 
@@ -14,6 +17,58 @@ def uuid_str() -> str:
     return str(uuid.uuid4())
 
 
+# -------------------------
+# Portable column types (SQL Server in production, SQLite for local runs)
+# -------------------------
+class GUID(TypeDecorator):
+    """
+    UNIQUEIDENTIFIER on SQL Server, CHAR(36) elsewhere. Binds str or UUID
+    values and returns uuid.UUID on every backend.
+    """
+
+    impl = CHAR(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mssql":
+            return dialect.type_descriptor(UNIQUEIDENTIFIER())
+        return dialect.type_descriptor(CHAR(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            try:
+                value = uuid.UUID(str(value))
+            except ValueError:
+                # Not an id at all (e.g. a bad path parameter): matches nothing.
+                return str(value)
+        return value if dialect.name == "mssql" else str(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(value)
+
+
+class utcnow(FunctionElement):
+    """Server-side UTC timestamp, for column defaults."""
+
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is UTC.
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "mssql")
+def _utcnow_mssql(element, compiler, **kw):
+    return "sysutcdatetime()"
+
+
 class TenantPlan(str, enum.Enum):
     demo = "demo"
     standard = "standard"
@@ -27,7 +82,7 @@ class UserRole(str, enum.Enum):
 class Tenant(Base):
     __tablename__ = "tenants"
 
-    id = Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid_str)
+    id = Column(GUID, primary_key=True, default=uuid_str)
     name = Column(String(200), nullable=False)
     slug = Column(String(200), unique=True, nullable=False)
 
@@ -35,14 +90,14 @@ class Tenant(Base):
     trial_ends_at = Column(DateTime(timezone=True))
     is_active = Column(Boolean, nullable=False, server_default="1")
 
-    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.sysutcdatetime())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=utcnow())
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid_str)
-    tenant_id = Column(UNIQUEIDENTIFIER, ForeignKey("tenants.id"), nullable=False)
+    id = Column(GUID, primary_key=True, default=uuid_str)
+    tenant_id = Column(GUID, ForeignKey("tenants.id"), nullable=False)
 
     email = Column(String(255), nullable=False, unique=True)
     password_hash = Column(String(255), nullable=False)
@@ -51,20 +106,36 @@ class User(Base):
     role = Column(Enum(UserRole), nullable=False, server_default="user")
     is_active = Column(Boolean, nullable=False, server_default="1")
 
-    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.sysutcdatetime())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=utcnow())
 
 
 class File(Base):
     __tablename__ = "files"
-
-    id = Column(UNIQUEIDENTIFIER, primary_key=True, default=uuid_str)
-    tenant_id = Column(UNIQUEIDENTIFIER, ForeignKey("tenants.id"), nullable=False)
-    uploaded_by = Column(UNIQUEIDENTIFIER, ForeignKey("users.id"), nullable=False)
+    __table_args__ = (
+        # Duplicate-upload lookup (same bytes within a tenant)
+        Index("ix_files_tenant_content_hash", "tenant_id", "content_hash"),
+        # Ingest jobs update every row sharing a (deduplicated) blob
+        Index("ix_files_blob_path", "blob_path"),
+        # Sidebar listing: newest first per tenant, keyset-paginated on (uploaded_at, id)
+        Index("ix_files_tenant_uploaded_at", "tenant_id", desc("uploaded_at"), desc("id")),
+    )
+
+    id = Column(GUID, primary_key=True, default=uuid_str)
+    tenant_id = Column(GUID, ForeignKey("tenants.id"), nullable=False)
+    uploaded_by = Column(GUID, ForeignKey("users.id"), nullable=False)
 
     original_name = Column(String(255), nullable=False)
     blob_path = Column(String(500), nullable=False)
     file_type = Column(String(20), nullable=False)
     size_bytes = Column(BigInteger)
+    content_hash = Column(String(64))  # sha256 hex of the raw upload
     status = Column(String(30), nullable=False, server_default="uploaded")
+    profile_path = Column(String(500))  # ingest-time statistical profile (JSON blob)
+    sheet_names = Column(Text)  # JSON list of workbook sheet names (Excel only)
+    blob_etag = Column(String(100))  # raw blob ETag at /upload-complete (direct uploads)
+
+    uploaded_at = Column(DateTime(timezone=True), nullable=False, server_default=utcnow())
 
-    uploaded_at = Column(DateTime(timezone=True), nullable=False, server_default=func.sysutcdatetime())
+    @property
+    def sheets(self) -> list:
+        return json.loads(self.sheet_names) if self.sheet_names else []
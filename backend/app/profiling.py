@@ -0,0 +1,354 @@
+# backend/app/profiling.py
+"""
+Per-file statistical profile, computed once at ingest and stored as JSON
+next to the raw blob (tenant_<t>/file_<f>/profile/profile.json).
+
+Profiles are built by chunk-wise aggregators, so large CSVs can be profiled
+while streaming without ever holding the full DataFrame.
+
+Unfiltered insights are answered from the profile without loading the data.
+"""
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+from app.storage import artifact_path
+
+# Bump when the profile layout changes; older profiles are then ignored.
+PROFILE_VERSION = 1
+
+TOP_K = 50
+HISTOGRAM_BINS = 30
+PROFILE_CACHE_MAX_ENTRIES = 256
+
+
+def profile_path(blob_path: str, sheet: int = 0) -> str:
+    # Sheet 0 (the only one for CSVs) keeps the original layout.
+    return artifact_path(blob_path, f"profile/sheet_{sheet}.json" if sheet else "profile/profile.json")
+
+
+def _num(v):
+    if v is None:
+        return None
+    v = float(v)
+    return None if (math.isnan(v) or math.isinf(v)) else v
+
+
+def _py(v):
+    # numpy scalars -> plain Python for json.dumps
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    return list(df.select_dtypes(include=[np.number]).columns)
+
+
+def categorical_columns(df: pd.DataFrame) -> list:
+    return list(df.select_dtypes(include=["object", "category"]).columns)
+
+
+# -------------------------
+# Chunk-wise aggregators
+# -------------------------
+# The profile is built in one pass over DataFrame chunks, so memory stays
+# O(columns) no matter how many rows stream through. A cached frame is simply
+# a single chunk, which keeps the in-memory and streamed paths identical.
+
+# Fine histogram resolution; re-binned to HISTOGRAM_BINS at the end.
+FINE_BINS = HISTOGRAM_BINS * 64
+
+# Distinct values tracked per text column before the rarest are pruned.
+VALUE_COUNTS_MAX_ENTRIES = 100_000
+
+
+class NumericAggregator:
+    """Count / mean / variance (Chan's merge), min / max and a range-doubling histogram."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._hist = None
+        self._lo = self._hi = None
+
+    def add(self, x: np.ndarray) -> None:
+        x = x[np.isfinite(x)]
+        nb = len(x)
+        if nb == 0:
+            return
+
+        mb = float(x.mean())
+        m2b = float(((x - mb) ** 2).sum())
+        n = self.n + nb
+        delta = mb - self.mean
+        self.mean += delta * nb / n
+        self.m2 += m2b + delta * delta * self.n * nb / n
+        self.n = n
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._bin(x)
+
+    def _bin(self, x: np.ndarray) -> None:
+        if self._hist is None:
+            lo, hi = float(x.min()), float(x.max())
+            if lo == hi:  # same convention as np.histogram
+                lo, hi = lo - 0.5, hi + 0.5
+            self._lo, self._hi = lo, hi
+            self._hist = np.zeros(FINE_BINS, dtype=np.int64)
+
+        # Widen the range by doubling the bin width; pairs of bins merge exactly.
+        while self.min < self._lo or self.max > self._hi:
+            pairs = self._hist.reshape(-1, 2).sum(axis=1)
+            empty = np.zeros_like(pairs)
+            span = self._hi - self._lo
+            if self.min < self._lo:
+                self._hist = np.concatenate([empty, pairs])
+                self._lo -= span
+            else:
+                self._hist = np.concatenate([pairs, empty])
+                self._hi += span
+
+        idx = ((x - self._lo) * (FINE_BINS / (self._hi - self._lo))).astype(np.int64)
+        np.clip(idx, 0, FINE_BINS - 1, out=idx)
+        self._hist += np.bincount(idx, minlength=FINE_BINS)
+
+    def histogram(self):
+        """(counts, edges) over [min, max] with HISTOGRAM_BINS equal bins."""
+        lo, hi = self.min, self.max
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        edges = np.linspace(lo, hi, HISTOGRAM_BINS + 1)
+
+        # Interpolate the cumulative fine counts at the coarse edges. Exact when
+        # the fine range was never widened (e.g. a single in-memory chunk).
+        fine_edges = np.linspace(self._lo, self._hi, FINE_BINS + 1)
+        cum = np.concatenate([[0], np.cumsum(self._hist)])
+        at = np.interp(edges, fine_edges, cum)
+        at[0], at[-1] = 0, self.n
+        return np.diff(np.rint(at)).astype(np.int64), edges
+
+    def result(self) -> dict:
+        out = {
+            "min": None, "max": None, "mean": None, "variance": None,
+            "histogram": {"edges": [], "counts": []},
+        }
+        if self.n == 0:
+            return out
+
+        counts, edges = self.histogram()
+        out.update(
+            min=_num(self.min),
+            max=_num(self.max),
+            mean=_num(self.mean),
+            variance=_num(self.m2 / (self.n - 1)) if self.n > 1 else None,
+            histogram={"edges": [float(e) for e in edges], "counts": [int(c) for c in counts]},
+        )
+        return out
+
+
+class ValueCountsAggregator:
+    """Running value counts for a text column (bounded to VALUE_COUNTS_MAX_ENTRIES)."""
+
+    def __init__(self):
+        self.counts = pd.Series(dtype="int64")
+        self.distinct = 0
+
+    def add(self, s: pd.Series) -> None:
+        vc = s.value_counts(dropna=True)
+        vc = vc[vc > 0]  # unused categories
+        if len(vc) == 0:
+            return
+        vc = pd.Series(vc.to_numpy(), index=vc.index.astype(object))
+        self.counts = vc if len(self.counts) == 0 else self.counts.add(vc, fill_value=0)
+        self.distinct = max(self.distinct, len(self.counts))
+
+        # High-cardinality columns (ids, free text) keep only their most
+        # frequent values; `distinct` then becomes a lower bound.
+        if len(self.counts) > VALUE_COUNTS_MAX_ENTRIES:
+            self.counts = self.counts.nlargest(VALUE_COUNTS_MAX_ENTRIES // 2)
+
+    def result(self) -> dict:
+        top = self.counts.sort_values(ascending=False, kind="stable").head(TOP_K)
+        return {
+            "distinct": int(self.distinct),
+            "top": [[_py(v), int(c)] for v, c in top.items()],
+        }
+
+
+class CorrelationAggregator:
+    """Co-moment matrix over rows where every numeric column is present."""
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        x = np.column_stack([_as_float(chunk[c]) for c in self.columns])
+        x = x[np.isfinite(x).all(axis=1)]
+        nb = len(x)
+        if nb == 0:
+            return
+
+        mb = x.mean(axis=0)
+        centered = x - mb
+        n = self.n + nb
+        delta = mb - self.mean
+        self.comoment += centered.T @ centered + np.outer(delta, delta) * self.n * nb / n
+        self.mean += delta * nb / n
+        self.n = n
+
+    def result(self) -> dict | None:
+        if len(self.columns) < 2 or self.n <= 1:
+            return None
+        d = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.comoment / np.outer(d, d)
+        return {
+            "columns": list(self.columns),
+            "matrix": [[_num(v) for v in row] for row in corr],
+        }
+
+
+def _as_float(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        return s.to_numpy(dtype="float64", na_value=np.nan)
+    # A column that parsed as numeric in earlier chunks; stray text counts as missing.
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+class _ColumnAggregator:
+    def __init__(self):
+        self.dtype = None
+        self.kind = None
+        self.nulls = 0
+        self.count = 0
+        self.stats = None
+        self._decided = False
+
+    def add(self, s: pd.Series, kind: str) -> None:
+        nulls = int(s.isna().sum())
+        self.nulls += nulls
+        self.count += len(s) - nulls
+
+        # The kind is fixed by the first chunk where the column has values,
+        # since all-empty chunks parse as float regardless of content.
+        if not self._decided:
+            self.dtype, self.kind = str(s.dtype), kind
+            if not self.count:
+                return
+            self._decided = True
+            if kind == "numeric":
+                self.stats = NumericAggregator()
+            elif kind == "categorical":
+                self.stats = ValueCountsAggregator()
+
+        if self.kind == "numeric":
+            self.stats.add(_as_float(s))
+        elif self.kind == "categorical":
+            self.stats.add(s)
+
+    def result(self) -> dict:
+        entry = {
+            "dtype": self.dtype,
+            "kind": self.kind,
+            "count": self.count,
+            "nulls": self.nulls,
+        }
+        if self.kind == "numeric":
+            entry.update((self.stats or NumericAggregator()).result())
+        elif self.kind == "categorical":
+            entry.update((self.stats or ValueCountsAggregator()).result())
+        return entry
+
+
+class ProfileAggregator:
+    """Builds a profile (see build_profile) from a stream of DataFrame chunks."""
+
+    def __init__(self, drop_empty_columns: bool = False):
+        self.drop_empty_columns = drop_empty_columns
+        self.rows = 0
+        self._columns: dict[str, _ColumnAggregator] = {}
+        self._correlation: CorrelationAggregator | None = None
+
+    def add(self, chunk: pd.DataFrame) -> "ProfileAggregator":
+        self.rows += len(chunk)
+        numeric = set(numeric_columns(chunk))
+        categorical = set(categorical_columns(chunk))
+
+        for col in chunk.columns:
+            kind = "numeric" if col in numeric else "categorical" if col in categorical else "other"
+            self._columns.setdefault(col, _ColumnAggregator()).add(chunk[col], kind)
+
+        # Correlation uses complete rows only; rows seen before a column got its
+        # first value could not have been complete, so restart when one joins.
+        corr_cols = [c for c, agg in self._columns.items() if agg.stats and agg.kind == "numeric"]
+        if self._correlation is None or self._correlation.columns != corr_cols:
+            self._correlation = CorrelationAggregator(corr_cols)
+        if len(corr_cols) >= 2:
+            self._correlation.add(chunk)
+        return self
+
+    def result(self) -> dict:
+        # When streaming a raw file, columns that never had a value are
+        # dropped, as _clean_df does for a fully parsed one.
+        columns = {
+            col: agg.result() for col, agg in self._columns.items()
+            if agg.count or not self.drop_empty_columns
+        }
+        return {
+            "version": PROFILE_VERSION,
+            "rows": int(self.rows),
+            "cols": len(columns),
+            "numeric_columns": [c for c, e in columns.items() if e["kind"] == "numeric"],
+            "categorical_columns": [c for c, e in columns.items() if e["kind"] == "categorical"],
+            "columns": columns,
+            "correlation": self._correlation.result() if self._correlation else None,
+        }
+
+
+def build_profile(df: pd.DataFrame) -> dict:
+    return ProfileAggregator().add(df).result()
+
+
+def write_profile(container, blob_path: str, profile: dict, sheet: int = 0) -> str:
+    target = profile_path(blob_path, sheet)
+    body = json.dumps(profile, allow_nan=False, default=str).encode("utf-8")
+    container.get_blob_client(target).upload_blob(body, overwrite=True)
+    return target
+
+
+# -------------------------
+# Loading (profiles are immutable per upload, so a small LRU is enough)
+# -------------------------
+_profile_cache: "OrderedDict[str, dict]" = OrderedDict()
+_profile_lock = threading.Lock()
+
+
+def load_profile(container, path: str) -> dict | None:
+    with _profile_lock:
+        if path in _profile_cache:
+            _profile_cache.move_to_end(path)
+            return _profile_cache[path]
+
+    try:
+        profile = json.loads(container.get_blob_client(path).download_blob().readall())
+    except ResourceNotFoundError:
+        return None
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+
+    with _profile_lock:
+        _profile_cache[path] = profile
+        while len(_profile_cache) > PROFILE_CACHE_MAX_ENTRIES:
+            _profile_cache.popitem(last=False)
+    return profile
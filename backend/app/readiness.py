@@ -0,0 +1,122 @@
+# backend/app/readiness.py
+"""
+Startup warm-up and readiness.
+
+The schema is owned by Alembic migrations (`alembic upgrade head`, run
+out-of-band before a deploy), so startup never inspects tables. Instead a
+background task opens what the first requests would otherwise pay for, and
+GET /ready answers 503 until every component is warm:
+
+  - database: a pooled connection on each engine, plus the applied
+    Alembic revision (fails until migrations have run)
+  - storage: the sync and async Blob container clients
+  - ingest_queue: the SQLite job queue
+  - executors: the analytics and password-hashing pools
+
+Components that fail (e.g. a serverless database still resuming) are
+retried every READINESS_RETRY_SECONDS.
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.auth import password_hasher
+from app.db import async_engine, engine
+from app.executor import analytics_executor
+from app.jobs import ingest_queue
+from app.storage import get_async_container_client, get_container_client
+
+logger = logging.getLogger(__name__)
+
+READINESS_RETRY_SECONDS = 5.0
+
+
+async def _warm_database() -> dict:
+    async with async_engine.connect() as conn:
+        revision = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+
+    def sync_ping():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    await asyncio.to_thread(sync_ping)
+    return {"schema_revision": revision}
+
+
+async def _warm_storage() -> dict:
+    container = get_container_client()
+    get_async_container_client()
+    # Opens a pooled connection (and TLS session) to the storage account.
+    if hasattr(container, "get_container_properties"):
+        await asyncio.to_thread(container.get_container_properties)
+    return {}
+
+
+async def _warm_ingest_queue() -> dict:
+    return {"jobs": await asyncio.to_thread(ingest_queue.stats)}
+
+
+async def _warm_executors() -> dict:
+    analytics_executor.warm_up()
+    password_hasher.warm_up()
+    return {}
+
+
+COMPONENTS = {
+    "database": _warm_database,
+    "storage": _warm_storage,
+    "ingest_queue": _warm_ingest_queue,
+    "executors": _warm_executors,
+}
+
+
+class Readiness:
+    def __init__(self, components: dict, retry_seconds: float):
+        self.components = components
+        self.retry_seconds = retry_seconds
+        self.state = {name: {"ready": False, "error": None} for name in components}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return all(c["ready"] for c in self.state.values())
+
+    async def _warm(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            details = await self.components[name]()
+        except Exception as e:
+            self.state[name] = {"ready": False, "error": f"{type(e).__name__}: {e}"}
+            logger.warning("Warm-up of %s failed: %s", name, e)
+            return
+        self.state[name] = {
+            "ready": True,
+            "error": None,
+            "seconds": round(time.perf_counter() - start, 3),
+            **details,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            pending = [name for name, c in self.state.items() if not c["ready"]]
+            await asyncio.gather(*(self._warm(name) for name in pending))
+            if self.ready:
+                logger.info("Warm-up complete")
+                return
+            await asyncio.sleep(self.retry_seconds)
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "components": self.state}
+
+
+readiness = Readiness(COMPONENTS, READINESS_RETRY_SECONDS)
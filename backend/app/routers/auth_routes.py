@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.deps import get_db
+from app.deps import get_async_db, get_db
 from app.models import User, Tenant, TenantPlan, UserRole
 from app.config import get_settings
 from app.auth import (
-    hash_password,
-    verify_password,
     create_access_token,
     create_refresh_token,
     get_current_user,
+    password_hasher,
 )
 settings = get_settings()
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -43,19 +44,24 @@ def generate_slug(name: str) -> str:
     )
 
 
+# Password hashing runs on app.auth.password_hasher's bounded pool and the
+# database is awaited, so neither the event loop nor a threadpool slot waits
+# on bcrypt or the network.
 @router.post("/register", response_model=TokenResponse)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     # Check if email is already used anywhere
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = (await db.execute(select(User).filter(User.email == payload.email))).scalars().first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     slug = generate_slug(payload.tenant_name)
 
-    existing_tenant = db.query(Tenant).filter(Tenant.slug == slug).first()
+    existing_tenant = (await db.execute(select(Tenant).filter(Tenant.slug == slug))).scalars().first()
     if existing_tenant:
         raise HTTPException(status_code=400, detail="Tenant name is already taken")
 
+    password_hash = await password_hasher.hash(payload.password)
+
     trial_ends_at = datetime.utcnow() + timedelta(days=settings.TRIAL_DAYS)
 
     tenant = Tenant(
@@ -65,17 +71,17 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)):
         trial_ends_at=trial_ends_at,
     )
     db.add(tenant)
-    db.flush()  # so tenant.id is available
+    await db.flush()  # so tenant.id is available
 
     user = User(
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=password_hash,
         tenant_id=tenant.id,
         role=UserRole.admin,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     access = create_access_token(user)
     refresh = create_refresh_token(user)
@@ -84,9 +90,12 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter(User.email == payload.email))).scalars().first()
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(payload.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     if not user.is_active:
@@ -94,6 +103,12 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 
     access = create_access_token(user)
     refresh = create_refresh_token(user)
+
+    if new_hash:
+        # Stored hash used an outdated cost (PASSWORD_BCRYPT_ROUNDS changed).
+        user.password_hash = new_hash
+        await db.commit()
+
     return TokenResponse(access_token=access, refresh_token=refresh)
 
 
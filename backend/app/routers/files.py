@@ -1,26 +1,34 @@
 # backend/app/routers/files.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List
 from uuid import uuid4, UUID
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
+import json
+import logging
 import re
 from urllib.parse import quote
 
-from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobSasPermissions
+from jose import JWTError, jwt
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.deps import get_db
-from app.auth import get_current_user
+from app.deps import get_async_db, get_db
+from app.auth import create_token, get_current_user
 from app.models import File as FileModel, User   # <-- IMPORTANT FIX
+from app.jobs import FAILED, enqueue_ingest, ingest_queue
+from app.storage import blob_sas_url, get_container_client, upload_stream
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
-blob_service = BlobServiceClient.from_connection_string(settings.AZURE_BLOB_CONNSTRING)
-container_client = blob_service.get_container_client(settings.BLOB_CONTAINER)
 
 
 class FileOut(BaseModel):
@@ -29,33 +37,81 @@ class FileOut(BaseModel):
     uploaded_at: datetime
     status: str
     size_bytes: int | None
+    sheets: List[str] = []
 
     class Config:
         orm_mode = True
 
 
+class UploadUrlIn(BaseModel):
+    filename: str
+    content_type: str
+    size_bytes: int | None = None
+
+
+class UploadCompleteIn(BaseModel):
+    upload_token: str
+
+
+ALLOWED_CONTENT_TYPES = (
+    "text/csv",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+)
+
+
+def _check_content_type(content_type: str | None) -> None:
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+
+def _raw_blob_path(tenant_id, file_id: str, filename: str) -> str:
+    return f"tenant_{tenant_id}/file_{file_id}/raw/{filename}"
+
+
+def _file_type(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "xlsx"
+
+
 @router.post("/upload", response_model=FileOut)
 async def upload_file(
     uploaded_file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
-    if uploaded_file.content_type not in (
-        "text/csv",
-        "application/vnd.ms-excel",
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    ):
-        raise HTTPException(status_code=400, detail="Unsupported file type")
+    _check_content_type(uploaded_file.content_type)
 
     file_id = str(uuid4())
-    tenant_prefix = f"tenant_{user.tenant_id}/file_{file_id}"
-    blob_path = f"{tenant_prefix}/raw/{uploaded_file.filename}"
-
-    data = await uploaded_file.read()
+    blob_path = _raw_blob_path(user.tenant_id, file_id, uploaded_file.filename)
+    file_type = _file_type(uploaded_file.filename)
+
+    # Same bytes already stored for this tenant: skip committing the new blob
+    # and share the original's blob, artifacts, cached frames and summaries.
+    original = None
+
+    async def commit_unless_duplicate(content_hash: str) -> bool:
+        nonlocal original
+        result = await db.execute(
+            select(FileModel)
+            .filter(
+                FileModel.tenant_id == user.tenant_id,
+                FileModel.content_hash == content_hash,
+                FileModel.file_type == file_type,
+                FileModel.status != FAILED,
+            )
+            .order_by(FileModel.uploaded_at)
+        )
+        original = result.scalars().first()
+        return original is None
 
     try:
-        blob_client = container_client.get_blob_client(blob_path)
-        blob_client.upload_blob(data, overwrite=True)
+        size_bytes, content_hash = await upload_stream(
+            blob_path,
+            uploaded_file.read,
+            block_size=settings.UPLOAD_BLOCK_SIZE,
+            concurrency=settings.UPLOAD_CONCURRENCY,
+            commit_if=commit_unless_duplicate,
+        )
     except Exception as ex:
         raise HTTPException(status_code=500, detail=f"Blob upload failed: {ex}")
 
@@ -65,31 +121,219 @@ async def upload_file(
         uploaded_by=user.id,
         original_name=uploaded_file.filename,
         blob_path=blob_path,
-        file_type="csv" if uploaded_file.filename.lower().endswith(".csv") else "xlsx",
-        size_bytes=len(data),
+        file_type=file_type,
+        size_bytes=size_bytes,
+        content_hash=content_hash,
         status="uploaded",
         uploaded_at=datetime.utcnow(),
     )
+    if original is not None:
+        db_file.blob_path = original.blob_path
+        db_file.status = original.status
+        db_file.profile_path = original.profile_path
+        db_file.sheet_names = original.sheet_names
+
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+
+    # Parsing, profiling and Parquet conversion run in the ingest worker
+    # (app.jobs); File.status moves to "processing" and then "ready" / "failed".
+    # Duplicates follow the original's job, which updates every row on the blob.
+    if original is None:
+        enqueue_ingest(db_file)
+
+    return db_file
+
+
+# -------------------------
+# Direct-to-blob uploads
+# -------------------------
+# 1. POST /upload-url      -> SAS URL (create/write on one new blob) + upload token
+# 2. browser               -> Put Block (in parallel) + Put Block List against the SAS URL
+# 3. POST /upload-complete -> blob is verified, File row created, ingest job enqueued
+#
+# The bytes never pass through the API. The content hash is computed by the
+# ingest job while it downloads the blob, so direct uploads are not
+# deduplicated at upload time. The SAS stays valid until it expires, so the
+# blob's ETag is recorded at completion and ingest only reads that version.
+@router.post("/upload-url")
+def create_upload_url(
+    payload: UploadUrlIn,
+    user: User = Depends(get_current_user),
+):
+    _check_content_type(payload.content_type)
+    filename = re.sub(r"[\\/\r\n]", "_", payload.filename).strip()
+    if not filename:
+        raise HTTPException(status_code=400, detail="Missing filename")
+
+    file_id = str(uuid4())
+    blob_path = _raw_blob_path(user.tenant_id, file_id, filename)
+    url = blob_sas_url(
+        blob_path,
+        BlobSasPermissions(create=True, write=True),
+        settings.UPLOAD_SAS_EXPIRY_MINUTES,
+    )
+    if url is None:
+        # Storage can't sign URLs (local stand-in); clients fall back to /upload.
+        return {"upload_url": None}
+
+    upload_token = create_token(
+        {
+            "type": "upload",
+            "sub": str(user.id),
+            "tenant_id": str(user.tenant_id),
+            "file_id": file_id,
+            "filename": filename,
+            "size_bytes": payload.size_bytes,
+        },
+        timedelta(minutes=settings.UPLOAD_SAS_EXPIRY_MINUTES),
+    )
+    return {
+        "upload_url": url,
+        "upload_token": upload_token,
+        "file_id": file_id,
+        "block_size": settings.UPLOAD_BLOCK_SIZE,
+        "concurrency": settings.UPLOAD_CONCURRENCY,
+        "expires_in": settings.UPLOAD_SAS_EXPIRY_MINUTES * 60,
+    }
+
+
+@router.post("/upload-complete", response_model=FileOut)
+def complete_upload(
+    payload: UploadCompleteIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    try:
+        claims = jwt.decode(payload.upload_token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    if (
+        claims.get("type") != "upload"
+        or claims.get("sub") != str(user.id)
+        or claims.get("tenant_id") != str(user.tenant_id)
+    ):
+        raise HTTPException(status_code=403, detail="Upload token does not belong to this user")
+
+    file_id = claims["file_id"]
+    existing = db.query(FileModel).filter(FileModel.id == file_id).first()
+    if existing is not None:
+        # Completion is idempotent (clients may retry after a dropped response).
+        return existing
 
+    blob_path = _raw_blob_path(user.tenant_id, file_id, claims["filename"])
+    try:
+        props = get_container_client().get_blob_client(blob_path).get_blob_properties()
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=400, detail="Upload not found; commit the block list first")
+    if claims.get("size_bytes") is not None and props.size != claims["size_bytes"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Uploaded size {props.size} does not match declared size {claims['size_bytes']}",
+        )
+
+    db_file = FileModel(
+        id=file_id,
+        tenant_id=user.tenant_id,
+        uploaded_by=user.id,
+        original_name=claims["filename"],
+        blob_path=blob_path,
+        file_type=_file_type(claims["filename"]),
+        size_bytes=props.size,
+        blob_etag=props.etag,
+        status="uploaded",
+        uploaded_at=datetime.utcnow(),
+    )
     db.add(db_file)
     db.commit()
     db.refresh(db_file)
 
+    enqueue_ingest(db_file)
     return db_file
 
 
+# -------------------------
+# Listing (keyset pagination)
+# -------------------------
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+# Only the columns FileOut needs.
+_LIST_COLUMNS = (
+    FileModel.id,
+    FileModel.original_name,
+    FileModel.uploaded_at,
+    FileModel.status,
+    FileModel.size_bytes,
+    FileModel.sheet_names,
+)
+
+
+def _encode_cursor(uploaded_at: datetime, file_id) -> str:
+    raw = json.dumps([uploaded_at.isoformat(), str(file_id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        uploaded_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(uploaded_at), str(UUID(file_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("[", "\\[")
+
+
 @router.get("/", response_model=List[FileOut])
-def list_files(
-    db: Session = Depends(get_db),
+async def list_files(
+    response: Response,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: str | None = None,
+    q: str | None = Query(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
-    files = (
-        db.query(FileModel)
+    """
+    Newest first, `limit` files per page, optionally only names containing
+    `q`. When more files follow, the X-Next-Cursor header holds the value to
+    pass as `cursor` for the next page.
+    """
+    stmt = (
+        select(*_LIST_COLUMNS)
         .filter(FileModel.tenant_id == user.tenant_id)
-        .order_by(FileModel.uploaded_at.desc())
-        .all()
+        .order_by(FileModel.uploaded_at.desc(), FileModel.id.desc())
+        .limit(limit + 1)
     )
-    return files
+    if q:
+        stmt = stmt.filter(FileModel.original_name.ilike(f"%{_escape_like(q)}%", escape="\\"))
+    if cursor:
+        uploaded_at, file_id = _decode_cursor(cursor)
+        stmt = stmt.filter(
+            or_(
+                FileModel.uploaded_at < uploaded_at,
+                and_(FileModel.uploaded_at == uploaded_at, FileModel.id < file_id),
+            )
+        )
+
+    rows = (await db.execute(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].uploaded_at, rows[-1].id)
+
+    return [
+        {
+            "id": row.id,
+            "original_name": row.original_name,
+            "uploaded_at": row.uploaded_at,
+            "status": row.status,
+            "size_bytes": row.size_bytes,
+            "sheets": json.loads(row.sheet_names) if row.sheet_names else [],
+        }
+        for row in rows
+    ]
 
 
 @router.get("/{file_id}", response_model=FileOut)
@@ -112,6 +356,35 @@ def get_file(
     return file
 
 
+@router.get("/{file_id}/status")
+def get_file_status(
+    file_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    file = (
+        db.query(FileModel)
+        .filter(
+            FileModel.id == file_id,
+            FileModel.tenant_id == user.tenant_id,
+        )
+        .first()
+    )
+    if not file:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    job = ingest_queue.latest_for(file.blob_path)
+    return {
+        "id": str(file.id),
+        "status": file.status,
+        "sheets": file.sheets,
+        "job": job and {
+            key: job[key]
+            for key in ("id", "status", "attempts", "error", "timings", "created_at", "started_at", "finished_at")
+        },
+    }
+
+
 def _content_disposition_attachment(filename: str) -> str:
     """Build a safe Content-Disposition header value with RFC 5987 support.
 
@@ -134,47 +407,153 @@ def _content_disposition_attachment(filename: str) -> str:
     return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{encoded}"
 
 
-@router.get("/{file_id}/download")
-@router.get("/{file_id}/download/")
-def download_file(
-    file_id: str,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
-):
+def _media_type(filename: str | None) -> str:
+    name_lc = (filename or "").lower()
+    if name_lc.endswith(".csv"):
+        return "text/csv"
+    if name_lc.endswith(".xlsx"):
+        return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    if name_lc.endswith(".xls"):
+        return "application/vnd.ms-excel"
+    return "application/octet-stream"
+
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Resolve a single-range `Range` header to inclusive (start, end) offsets.
+
+    Returns None to serve the whole file (no header, or a form we don't
+    support such as multiple ranges); raises 416 when the range is
+    unsatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise _range_not_satisfiable(size)
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise _range_not_satisfiable(size)
+    return start, end
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def _get_tenant_file(db: Session, file_id: str, tenant_id) -> FileModel:
     file = (
         db.query(FileModel)
         .filter(
             FileModel.id == file_id,
-            FileModel.tenant_id == user.tenant_id,
+            FileModel.tenant_id == tenant_id,
         )
         .first()
     )
     if not file:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return file
+
+
+def _download_sas_url(file: FileModel) -> str | None:
+    if settings.DOWNLOAD_MODE != "redirect":
+        return None
+    return blob_sas_url(
+        file.blob_path,
+        BlobSasPermissions(read=True),
+        settings.DOWNLOAD_SAS_EXPIRY_MINUTES,
+        content_disposition=_content_disposition_attachment(file.original_name),
+        content_type=_media_type(file.original_name),
+    )
+
+
+@router.get("/{file_id}/download-url")
+def download_url(
+    file_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Short-lived read-only URL the browser can download from directly.
+    `url` is null when downloads are proxied; use /download then.
+    """
+    file = _get_tenant_file(db, file_id, user.tenant_id)
+    url = _download_sas_url(file)
+    return {"url": url, "expires_in": settings.DOWNLOAD_SAS_EXPIRY_MINUTES * 60 if url else None}
+
+
+@router.get("/{file_id}/download")
+@router.get("/{file_id}/download/")
+def download_file(
+    file_id: str,
+    range_header: str | None = Header(None, alias="Range"),
+    if_range: str | None = Header(None, alias="If-Range"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    file = _get_tenant_file(db, file_id, user.tenant_id)
 
     try:
-        blob_client = container_client.get_blob_client(file.blob_path)
-        downloader = blob_client.download_blob()
+        sas_url = _download_sas_url(file)
+        if sas_url:
+            return RedirectResponse(sas_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
 
-        def stream():
-            for chunk in downloader.chunks():
-                yield chunk
+        blob_client = get_container_client().get_blob_client(file.blob_path)
+        props = blob_client.get_blob_properties()
+        size = props.size
 
-        name_lc = (file.original_name or "").lower()
-        if name_lc.endswith(".csv"):
-            media_type = "text/csv"
-        elif name_lc.endswith(".xlsx"):
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        elif name_lc.endswith(".xls"):
-            media_type = "application/vnd.ms-excel"
-        else:
-            media_type = "application/octet-stream"
+        # If-Range: only honour the range while the blob is unchanged.
+        byte_range = None
+        if if_range is None or if_range == props.etag:
+            byte_range = _parse_range(range_header, size)
 
         headers = {
             "Content-Disposition": _content_disposition_attachment(file.original_name),
+            "Accept-Ranges": "bytes",
+            "ETag": props.etag,
         }
+        if byte_range is None:
+            downloader = blob_client.download_blob()
+            headers["Content-Length"] = str(size)
+            status_code = status.HTTP_200_OK
+        else:
+            start, end = byte_range
+            downloader = blob_client.download_blob(offset=start, length=end - start + 1)
+            headers["Content-Length"] = str(end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+
+        def stream():
+            for chunk in downloader.chunks():
+                yield chunk
 
-        return StreamingResponse(stream(), media_type=media_type, headers=headers)
+        return StreamingResponse(
+            stream(),
+            status_code=status_code,
+            media_type=_media_type(file.original_name),
+            headers=headers,
+        )
 
+    except HTTPException:
+        raise
+    except ResourceNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File content not found")
     except Exception as ex:
         raise HTTPException(status_code=500, detail=f"Download failed: {ex}")
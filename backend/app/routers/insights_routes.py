@@ -1,46 +1,239 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import hashlib
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models import User, File
 from app.auth import get_current_user
-from app.deps import get_db
-from sqlalchemy.orm import Session
-from app.insights import generate_insights,load_file_from_blob, generate_ai_summary
+from app.deps import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.executor import TaskStore, analytics_executor
+from app.responses import (
+    ResponseCache,
+    SafeJSONResponse,
+    cached_json,
+    etag_matches,
+    not_modified,
+)
+from app.jobs import PENDING_STATUSES, ensure_ingest
+from app.insights import INSIGHTS_VERSION, generate_insights, head_rows
+from app.profiling import profile_path as sheet_profile_path
+from app.summaries import (
+    generate_ai_summary,
+    normalize_filters,
+    summary_executor,
+    summary_key,
+    summary_store,
+)
 
+settings = get_settings()
 router = APIRouter(prefix="/api/files", tags=["insights"])
 
-@router.post("/{file_id}/insights")
+# Longest a client may long-poll for a pending summary / exact result.
+MAX_SUMMARY_WAIT_SECONDS = 30
+
+# Exact (non-sampled) insights requested for very large files.
+exact_results = TaskStore(settings.EXACT_RESULTS_MAX_ENTRIES)
+
+# Rendered insights bodies, keyed like their ETag.
+insights_cache = ResponseCache(settings.INSIGHTS_RESPONSE_CACHE_MAX_BYTES)
+
+
+async def _get_file(db: AsyncSession, file_id: str, user: User) -> File:
+    result = await db.execute(
+        select(File).filter(File.id == file_id, File.tenant_id == user.tenant_id)
+    )
+    file = result.scalars().first()
+    if not file:
+        raise HTTPException(404, "File not found")
+    return file
+
+
+def _ingested(file: File) -> File:
+    if file.status in PENDING_STATUSES:
+        # Insights and summaries are served from pre-built artifacts; poll
+        # GET /status meanwhile.
+        ensure_ingest(file)
+        raise HTTPException(409, "File is still being processed", headers={"Retry-After": "2"})
+    return file
+
+
+def _sheet_index(file: File, sheet) -> int:
+    """Workbook sheet by name or number; None means the first sheet."""
+    if sheet in (None, ""):
+        return 0
+    names = file.sheets
+    if sheet in names:
+        return names.index(sheet)
+    if isinstance(sheet, int) and 0 <= sheet < max(len(names), 1):
+        return sheet
+    raise HTTPException(404, f"Sheet not found: {sheet}")
+
+
+def _profile_path(file: File, sheet: int) -> str | None:
+    return file.profile_path if sheet == 0 else sheet_profile_path(file.blob_path, sheet)
+
+
+def _summary_content(file: File, tenant_id: str) -> str:
+    return f"{tenant_id}:{file.content_hash or file.blob_path}"
+
+
+def _start_summary(file: File, tenant_id: str, filters: dict, force: bool = False, sheet: int = 0):
+    """
+    Kick off (or reuse) the memoized background summary for file + sheet + filters.
+    Keyed by content within the tenant, so re-uploads of the same bytes share it.
+    """
+    content = _summary_content(file, tenant_id)
+    key = summary_key(f"{content}:sheet_{sheet}" if sheet else content, filters)
+    summary_store.remember(key, content, sheet, filters)
+    blob_path, size = file.blob_path, file.size_bytes
+
+    def compute() -> str:
+        # The prompt only shows the first matching rows, so large files are
+        # read just far enough to find them.
+        return generate_ai_summary(head_rows(blob_path, filters, sheet=sheet, size=size))
+
+    async def run() -> str:
+        return await summary_executor.run_io(tenant_id, compute)
+
+    return key, summary_store.start(key, run, force=force)
+
+
+def _start_exact(file: File, tenant_id: str, filters: dict, sheet: int = 0) -> str:
+    raw = json.dumps([file.blob_path, sheet, normalize_filters(filters), INSIGHTS_VERSION], default=str)
+    key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    blob_path, profile_path, size = file.blob_path, _profile_path(file, sheet), file.size_bytes
+
+    async def run() -> dict:
+        return await analytics_executor.run_cpu(
+            tenant_id, generate_insights, blob_path, filters, profile_path, True, sheet, size
+        )
+
+    exact_results.start(key, run, owner=_exact_owner(file, tenant_id))
+    return key
+
+
+def _exact_owner(file: File, tenant_id: str) -> str:
+    # Duplicate uploads share a blob, and so its exact results.
+    return f"{tenant_id}:{file.blob_path}"
+
+
+def _insights_key(file: File, tenant_id: str, sheet: int, filters: dict) -> str:
+    # Same content + sheet + filters + pipeline version -> byte-identical response.
+    raw = json.dumps(
+        [tenant_id, file.content_hash or file.blob_path, sheet, normalize_filters(filters), INSIGHTS_VERSION],
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@router.post("/{file_id}/insights", response_class=SafeJSONResponse)
 async def get_file_insights(
     file_id: str,
     payload: dict,
+    request: Request,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    file = (
-        db.query(File)
-        .filter(File.id == file_id, File.tenant_id == user.tenant_id)
-        .first()
+    file = _ingested(await _get_file(db, file_id, user))
+
+    filters = payload.get("filters", {})
+    sheet = _sheet_index(file, payload.get("sheet"))
+    tenant_id = str(user.tenant_id)
+
+    key = _insights_key(file, tenant_id, sheet, filters)
+    etag = f'"{key}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    body = insights_cache.get(key)
+    if body is not None:
+        return cached_json(body, etag)
+
+    # The summary is fetched separately via GET /ai-summary/{ai_summary_id}.
+    # Cached and 304 responses already carry the id of the one started here.
+    summary_id, _ = _start_summary(file, tenant_id, filters, sheet=sheet)
+
+    result = await analytics_executor.run_cpu(
+        str(user.tenant_id), generate_insights,
+        file.blob_path, filters, _profile_path(file, sheet), False, sheet, file.size_bytes,
     )
+    if file.sheets:
+        result["sheet"] = file.sheets[sheet]
 
-    if not file:
-        raise HTTPException(404, "File not found")
+    result["ai_summary_id"] = summary_id
 
-    filters = payload.get("filters", {})
+    # Sampled answer now; exact numbers computed in the background on request,
+    # fetched via GET /insights/exact/{exact_job_id}. Estimates are never
+    # cached, since a later request for the same key may be answered exactly.
+    if "sampling" in result:
+        if payload.get("exact"):
+            result["exact_job_id"] = _start_exact(file, tenant_id, filters, sheet)
+        return SafeJSONResponse(result, headers={"Cache-Control": "no-store"})
 
-    return generate_insights(file.blob_path, filters)
+    response = SafeJSONResponse(result)
+    insights_cache.put(key, response.body)
+    return cached_json(response.body, etag)
 
-@router.post("/{file_id}/ai-summary")
-def regenerate_ai_summary(
+
+@router.get("/{file_id}/insights/exact/{job_id}", response_class=SafeJSONResponse)
+async def get_exact_insights(
     file_id: str,
+    job_id: str,
+    wait: float = 0,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
 ):
-    file = (
-        db.query(File)
-        .filter(File.id == file_id, File.tenant_id == user.tenant_id)
-        .first()
+    file = await _get_file(db, file_id, user)
+
+    status = await exact_results.wait(
+        job_id, min(max(wait, 0), MAX_SUMMARY_WAIT_SECONDS), owner=_exact_owner(file, str(user.tenant_id))
     )
-    if not file:
-        raise HTTPException(404, "File not found")
+    if status is None:
+        raise HTTPException(404, "Unknown or expired exact-insights job")
+    return SafeJSONResponse(status)
+
+
+@router.get("/{file_id}/ai-summary/{summary_id}")
+async def get_ai_summary(
+    file_id: str,
+    summary_id: str,
+    wait: float = 0,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    file = _ingested(await _get_file(db, file_id, user))
+    tenant_id = str(user.tenant_id)
+
+    request = summary_store.request(summary_id)
+    if request is None or request["content"] != _summary_content(file, tenant_id):
+        raise HTTPException(404, "Unknown or expired summary; POST /ai-summary to start a new one")
+
+    if summary_store.status(summary_id) is None:
+        # Evicted: recompute it for the sheet and filters it was started with.
+        _start_summary(file, tenant_id, request["filters"], sheet=request["sheet"])
+    return await summary_store.wait(summary_id, min(max(wait, 0), MAX_SUMMARY_WAIT_SECONDS))
+
+
+@router.post("/{file_id}/ai-summary")
+async def regenerate_ai_summary(
+    file_id: str,
+    payload: dict | None = None,
+    force: bool = False,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    file = _ingested(await _get_file(db, file_id, user))
+    filters = (payload or {}).get("filters", {})
+    sheet = _sheet_index(file, (payload or {}).get("sheet"))
 
-    df = load_file_from_blob(file.blob_path)
-    summary = generate_ai_summary(df)
-    return {"summary": summary}
+    summary_id, task = _start_summary(file, str(user.tenant_id), filters, force=force, sheet=sheet)
+    try:
+        # shield: a client disconnect must not cancel the shared computation
+        summary = await asyncio.shield(task)
+    except HTTPException:
+        raise
+    except Exception as e:
+        summary = f"AI summary unavailable: {type(e).__name__}"
+    return {"id": summary_id, "summary": summary}
@@ -0,0 +1,210 @@
+# backend/app/sampling.py
+"""
+Sampling mode for files too large to load on the request path.
+
+Rows are streamed in chunks into a stratified reservoir (one reservoir per
+value of a filter dimension, Algorithm R within each stratum). Every sampled
+row carries a weight N_s / n_s, so counts and means are unbiased estimates of
+the full population; filtering the sample (Sample.take) gives estimates for
+the matching rows. Counts and means come with normal-approximation
+confidence intervals.
+"""
+import numpy as np
+import pandas as pd
+
+from app.filter_index import MAX_FILTER_VALUES
+
+# Floor per stratum so rare filter values still get a usable sample.
+MIN_ROWS_PER_STRATUM = 200
+Z_95 = 1.959963984540054
+
+_NO_STRATUM = "__all__"
+_NULL_STRATUM = "__null__"
+
+
+class StratifiedReservoir:
+    def __init__(self, size: int, strata_col: str | None = None, seed: int = 0):
+        self.size = size
+        self.strata_col = strata_col
+        self.per_stratum: int | None = None
+        self._rng = np.random.default_rng(seed)
+        self._frames: dict = {}
+        self._seen: dict = {}
+
+    def _pick_strata_col(self, chunk: pd.DataFrame) -> None:
+        # Without a hint, stratify by the first text column that looks like a filter.
+        for col in chunk.select_dtypes(include=["object", "category"]).columns:
+            if chunk[col].nunique(dropna=True) <= MAX_FILTER_VALUES:
+                self.strata_col = col
+                return
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        if len(chunk) == 0:
+            return
+
+        if self.per_stratum is None:
+            if self.strata_col is None:
+                self._pick_strata_col(chunk)
+            n_strata = chunk[self.strata_col].nunique(dropna=False) if self.strata_col else 1
+            self.per_stratum = max(MIN_ROWS_PER_STRATUM, self.size // max(1, n_strata))
+
+        if self.strata_col is None or self.strata_col not in chunk.columns:
+            self._add(_NO_STRATUM, chunk)
+            return
+
+        col = chunk[self.strata_col]
+        keys = col.astype(object).where(col.notna(), _NULL_STRATUM)
+        for key, part in chunk.groupby(keys, sort=False):
+            self._add(key, part)
+
+    def _add(self, key, part: pd.DataFrame) -> None:
+        cap = self.per_stratum
+        seen = self._seen.get(key, 0)
+        current = self._frames.get(key)
+        n = len(part)
+
+        # Fill phase: the first `cap` rows go straight in, merged with the
+        # stored sample so replacements below can hit either.
+        take = min(max(cap - seen, 0), n)
+        if take:
+            filled = part.iloc[:take].set_axis(np.arange(seen, seen + take))
+            current = filled if current is None else pd.concat([current, filled])
+
+        # Replacement phase: row i (0-based overall) replaces slot j ~ U[0, i].
+        if take < n:
+            idx = np.arange(seen + take, seen + n)
+            slots = self._rng.integers(0, idx + 1)
+            keep = slots < cap
+            if keep.any():
+                rows = part.iloc[take:][keep]
+                slots = slots[keep]
+                # Later rows win when the same slot is hit twice.
+                _, last = np.unique(slots[::-1], return_index=True)
+                order = len(slots) - 1 - last
+                rows = rows.iloc[order].set_axis(slots[order])
+                current = pd.concat([current.drop(index=rows.index), rows])
+
+        if current is not None:
+            self._frames[key] = current
+        self._seen[key] = seen + n
+
+    def result(self) -> "Sample":
+        frames, weights, strata, population, sizes = [], [], [], {}, {}
+        for key, frame in self._frames.items():
+            n_s = len(frame)
+            N_s = self._seen[key]
+            frames.append(frame)
+            weights.append(np.full(n_s, N_s / n_s))
+            strata.append(np.full(n_s, len(population)))
+            population[key] = N_s
+            sizes[key] = n_s
+
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            return Sample(
+                df,
+                np.concatenate(weights),
+                np.concatenate(strata),
+                population,
+                sizes,
+                self.strata_col,
+            )
+        return Sample(pd.DataFrame(), np.array([]), np.array([], dtype=int), {}, {}, self.strata_col)
+
+
+class Sample:
+    """A weighted sample plus what is needed to turn it into population estimates."""
+
+    def __init__(self, df, weights, strata, population, sizes, strata_col):
+        self.df = df
+        self.weights = weights
+        self.strata = strata  # stratum number per row
+        self.population = population
+        self.sizes = sizes
+        self.strata_col = strata_col
+
+    @property
+    def population_rows(self) -> int:
+        return int(sum(self.population.values()))
+
+    @property
+    def sample_rows(self) -> int:
+        return int(len(self.df))
+
+    @property
+    def exact(self) -> bool:
+        return all(self.sizes[k] == self.population[k] for k in self.population)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.df.memory_usage(deep=True).sum()) + self.weights.nbytes + self.strata.nbytes
+
+    def take(self, rows: np.ndarray) -> "Sample":
+        """
+        The sampled rows selected by boolean `rows` (e.g. a filter), still
+        weighted against the full strata so estimates cover the matching
+        part of the population.
+        """
+        return Sample(
+            self.df[rows].reset_index(drop=True),
+            self.weights[rows],
+            self.strata[rows],
+            self.population,
+            self.sizes,
+            self.strata_col,
+        )
+
+    def count_ci(self, z: float = Z_95):
+        """Estimated number of population rows represented, and its (lo, hi) interval."""
+        population = list(self.population.values())
+        sizes = list(self.sizes.values())
+        matched = np.bincount(self.strata, minlength=len(population)) if len(population) else []
+        total, var = 0.0, 0.0
+        for N_s, n_s, m_s in zip(population, sizes, matched):
+            p = m_s / n_s
+            total += N_s * p
+            if n_s > 1:
+                fpc = max(0.0, 1 - n_s / N_s)
+                var += N_s ** 2 * fpc * p * (1 - p) / (n_s - 1)
+        half = z * float(np.sqrt(var))
+        return float(total), max(0.0, total - half), total + half
+
+    def mean_ci(self, col: str, z: float = Z_95):
+        """Stratified mean of non-null values and its (lo, hi) interval."""
+        y = pd.to_numeric(self.df[col], errors="coerce").to_numpy(dtype="float64")
+        valid = ~np.isnan(y)
+        if not valid.any():
+            return None, None, None
+
+        population = list(self.population.values())
+        sizes = list(self.sizes.values())
+        est_total = 0.0  # estimated non-null population per stratum
+        parts = []
+        for s in range(len(population)):
+            sel = valid & (self.strata == s)
+            n_s = int(sel.sum())
+            if n_s == 0:
+                continue
+            N_s = population[s] * n_s / sizes[s]
+            ys = y[sel]
+            var_s = ys.var(ddof=1) if n_s > 1 else 0.0
+            fpc = max(0.0, 1 - sizes[s] / population[s])
+            parts.append((N_s, ys.mean(), var_s, n_s, fpc))
+            est_total += N_s
+
+        mean = sum(N_s * m for N_s, m, _, _, _ in parts) / est_total
+        var = sum((N_s / est_total) ** 2 * fpc * v / n for N_s, _, v, n, fpc in parts)
+        half = z * float(np.sqrt(var))
+        return float(mean), float(mean - half), float(mean + half)
+
+    def weighted_counts(self, col: str) -> pd.Series:
+        s = self.df[col]
+        valid = s.notna().to_numpy()
+        counts = pd.Series(self.weights[valid]).groupby(s[valid].to_numpy()).sum()
+        return counts.round().astype(np.int64).sort_values(ascending=False)
+
+    def histogram(self, col: str, bins: int):
+        y = pd.to_numeric(self.df[col], errors="coerce").to_numpy(dtype="float64")
+        valid = ~np.isnan(y)
+        counts, edges = np.histogram(y[valid], bins=bins, weights=self.weights[valid])
+        return np.rint(counts).astype(np.int64), edges
@@ -0,0 +1,206 @@
+# backend/app/schema.py
+"""
+Typing stage for parsed uploads.
+
+pandas leaves int64/float64 everywhere and object dtype for every text
+column, including numbers and dates stored as text in messy sheets. Here we
+infer a compact type per column once, at ingest:
+
+  - numeric-like text -> numbers
+  - date-like text    -> datetime64
+  - repetitive text   -> category
+  - numbers           -> smallest int / float that holds them losslessly
+                         (64-bit when only a sample of the file was seen)
+
+The resulting schema ({column: dtype}) is stored next to the raw blob
+(tenant_<t>/file_<f>/schema/schema.json; schema/sheet_<n>.json for later
+workbook sheets) so later loads and streamed chunks of the same file just
+cast to it instead of inferring again.
+"""
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+from app.filter_index import MAX_FILTER_VALUES
+from app.storage import artifact_path
+
+# Bump when inference rules change; older schemas are then ignored.
+SCHEMA_VERSION = 1
+
+# Share of non-null values that must convert for a text column to be retyped.
+MIN_PARSE_RATIO = 0.95
+
+# Text columns with at most this share of distinct values become categories.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Values inspected before attempting a full numeric / datetime parse.
+PROBE_SAMPLE_SIZE = 1000
+_DATE_LIKE = re.compile(r"^\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})")
+
+SCHEMA_CACHE_MAX_ENTRIES = 256
+
+
+def schema_path(blob_path: str, sheet: int = 0) -> str:
+    return artifact_path(blob_path, f"schema/sheet_{sheet}.json" if sheet else "schema/schema.json")
+
+
+# -------------------------
+# Inference
+# -------------------------
+def _parsed_enough(parsed: pd.Series, original: pd.Series) -> bool:
+    present = int(original.notna().sum())
+    return present > 0 and parsed.notna().sum() >= MIN_PARSE_RATIO * present
+
+
+def _numeric_text(s: pd.Series):
+    sample = s.dropna().head(PROBE_SAMPLE_SIZE)
+    if len(sample) == 0 or pd.to_numeric(sample.astype(str).str.strip(), errors="coerce").notna().mean() < MIN_PARSE_RATIO:
+        return None
+    parsed = pd.to_numeric(s.astype(str).str.strip().where(s.notna()), errors="coerce")
+    return parsed if _parsed_enough(parsed, s) else None
+
+
+def _date_text(s: pd.Series):
+    sample = s.dropna().astype(str).head(PROBE_SAMPLE_SIZE)
+    if len(sample) == 0 or sample.str.match(_DATE_LIKE).mean() < MIN_PARSE_RATIO:
+        return None
+    parsed = pd.to_datetime(s.where(s.notna()).astype(str), errors="coerce", format="mixed")
+    return parsed if _parsed_enough(parsed, s) else None
+
+
+def _downcast(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return pd.to_numeric(s, downcast="integer")
+    if pd.api.types.is_float_dtype(s.dtype):
+        values = s.to_numpy()
+        # Whole numbers with gaps (ints with missing values) stay float but
+        # shrink; other floats only when float32 holds them exactly.
+        small = values.astype(np.float32)
+        if np.array_equal(small.astype(values.dtype), values, equal_nan=True):
+            return s.astype(np.float32)
+    return s
+
+
+def _is_categorical_text(s: pd.Series) -> bool:
+    n = int(s.notna().sum())
+    if n == 0:
+        return False
+    # Mixed-type columns stay object; they are stringified for Parquet.
+    if pd.api.types.infer_dtype(s, skipna=True) != "string":
+        return False
+    distinct = s.nunique(dropna=True)
+    return distinct <= MAX_FILTER_VALUES or distinct <= CATEGORY_MAX_UNIQUE_RATIO * n
+
+
+def infer_types(df: pd.DataFrame, downcast: bool = True) -> pd.DataFrame:
+    """
+    Return `df` with compact inferred dtypes (see module docstring). Pass
+    downcast=False when `df` is only a sample of the file, e.g. the first
+    chunk of a streamed CSV: later rows may not fit the sample's range.
+    """
+    shrink = _downcast if downcast else (lambda s: s)
+    typed = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s.dtype) or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            if downcast:
+                typed[col] = _downcast(s)
+        elif s.dtype == object:
+            parsed = _numeric_text(s)
+            if parsed is not None:
+                typed[col] = shrink(parsed)
+                continue
+            parsed = _date_text(s)
+            if parsed is not None:
+                typed[col] = parsed
+            elif _is_categorical_text(s):
+                typed[col] = s.astype("category")
+    return df.assign(**typed) if typed else df
+
+
+def schema_of(df: pd.DataFrame) -> dict:
+    return {
+        "version": SCHEMA_VERSION,
+        "columns": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+    }
+
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Cast `df` to a stored schema; values that don't fit become missing."""
+    typed = {}
+    for col, dtype in schema["columns"].items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        s = df[col]
+        if dtype == "category":
+            typed[col] = s.astype("category")
+        elif dtype.startswith("datetime64"):
+            typed[col] = pd.to_datetime(s, errors="coerce", format="mixed")
+        elif dtype.startswith(("int", "uint", "float")):
+            num = s if pd.api.types.is_numeric_dtype(s.dtype) else pd.to_numeric(s, errors="coerce")
+            # A chunk can have gaps an integer column did not; keep it float then.
+            if dtype.startswith(("int", "uint")) and num.isna().any():
+                typed[col] = num.astype(np.float64)
+            elif _fits(num, np.dtype(dtype)):
+                typed[col] = num.astype(dtype)
+            else:
+                # Values outside the range the schema was inferred from would
+                # wrap (ints) or lose precision (float32); widen instead.
+                typed[col] = num.astype(np.float64 if num.dtype.kind == "f" or dtype.startswith("float") else np.int64)
+    return df.assign(**typed) if typed else df
+
+
+def _fits(num: pd.Series, dtype: np.dtype) -> bool:
+    if len(num) == 0 or num.dtype == dtype:
+        return True
+    values = num.to_numpy()
+    if dtype.kind in "iu":
+        if values.dtype.kind == "f":
+            return False
+        info = np.iinfo(dtype)
+        return bool(values.min() >= info.min and values.max() <= info.max)
+    with np.errstate(over="ignore", invalid="ignore"):
+        narrowed = values.astype(dtype).astype(values.dtype)
+    return np.array_equal(narrowed, values, equal_nan=values.dtype.kind == "f")
+
+
+# -------------------------
+# Storage (schemas are immutable per upload, so a small LRU is enough)
+# -------------------------
+_schema_cache: "OrderedDict[str, dict]" = OrderedDict()
+_schema_lock = threading.Lock()
+
+
+def write_schema(container, blob_path: str, schema: dict, sheet: int = 0) -> str:
+    target = schema_path(blob_path, sheet)
+    body = json.dumps(schema).encode("utf-8")
+    container.get_blob_client(target).upload_blob(body, overwrite=True)
+    return target
+
+
+def load_schema(container, blob_path: str, sheet: int = 0) -> dict | None:
+    path = schema_path(blob_path, sheet)
+    with _schema_lock:
+        if path in _schema_cache:
+            _schema_cache.move_to_end(path)
+            return _schema_cache[path]
+
+    try:
+        schema = json.loads(container.get_blob_client(path).download_blob().readall())
+    except ResourceNotFoundError:
+        return None
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+
+    with _schema_lock:
+        _schema_cache[path] = schema
+        while len(_schema_cache) > SCHEMA_CACHE_MAX_ENTRIES:
+            _schema_cache.popitem(last=False)
+    return schema
@@ -0,0 +1,446 @@
+# backend/app/storage.py
+"""
+Shared Blob Storage access.
+
+One pooled container client per process (sync for threadpool code, aio for
+async routes) instead of building a BlobServiceClient per request.
+
+Testing:
+  - Azurite: point AZURE_BLOB_CONNSTRING at the emulator
+    (e.g. "UseDevelopmentStorage=true").
+  - No emulator: set BLOB_LOCAL_ROOT to a directory and blobs are stored as
+    plain files underneath it.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
+from azure.storage.blob import BlobBlock, BlobSasPermissions, BlobServiceClient, generate_blob_sas
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+from app.config import get_settings
+
+settings = get_settings()
+
+LOCAL_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def artifact_path(blob_path: str, name: str) -> str:
+    """
+    Derived artifacts live next to the raw upload:
+    tenant_<t>/file_<f>/raw/<name>  ->  tenant_<t>/file_<f>/<name>
+    """
+    prefix = blob_path.rsplit("/raw/", 1)[0]
+    return f"{prefix}/{name}"
+
+
+# -------------------------
+# Local filesystem stand-in (mirrors the subset of the SDK we use)
+# -------------------------
+class _LocalDownloader:
+    def __init__(self, path: Path, offset: int | None = None, length: int | None = None):
+        self._path = path
+        total = path.stat().st_size
+        self._offset = offset or 0
+        end = total if length is None else min(total, self._offset + length)
+        self.size = max(0, end - self._offset)
+
+    def chunks(self):
+        remaining = self.size
+        with open(self._path, "rb") as fh:
+            fh.seek(self._offset)
+            while remaining > 0:
+                chunk = fh.read(min(LOCAL_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def readall(self) -> bytes:
+        return b"".join(self.chunks())
+
+
+class LocalBlobClient:
+    def __init__(self, root: Path, blob_name: str):
+        self.blob_name = blob_name
+        self._path = root / blob_name
+
+    def _require(self):
+        if not self._path.is_file():
+            raise ResourceNotFoundError(f"Blob not found: {self.blob_name}")
+
+    def exists(self) -> bool:
+        return self._path.is_file()
+
+    def upload_blob(self, data, overwrite: bool = False, **kwargs):
+        if self._path.exists() and not overwrite:
+            raise ResourceExistsError(f"Blob already exists: {self.blob_name}")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                fh.write(data)
+            elif hasattr(data, "read"):
+                while chunk := data.read(LOCAL_CHUNK_SIZE):
+                    fh.write(chunk)
+            else:
+                for chunk in data:
+                    fh.write(chunk)
+        os.replace(tmp, self._path)
+        return self.get_blob_properties()
+
+    def _block_dir(self) -> Path:
+        return self._path.with_name(f".{self._path.name}.blocks")
+
+    def stage_block(self, block_id: str, data, **kwargs):
+        block_dir = self._block_dir()
+        block_dir.mkdir(parents=True, exist_ok=True)
+        (block_dir / block_id).write_bytes(bytes(data))
+
+    def commit_block_list(self, block_list, **kwargs):
+        block_dir = self._block_dir()
+        ids = [b.id if hasattr(b, "id") else str(b) for b in block_list]
+
+        def blocks():
+            for block_id in ids:
+                yield (block_dir / block_id).read_bytes()
+
+        props = self.upload_blob(blocks(), overwrite=True)
+        shutil.rmtree(block_dir, ignore_errors=True)
+        return props
+
+    def download_blob(self, offset: int | None = None, length: int | None = None, **kwargs):
+        self._require()
+        etag = kwargs.get("etag")
+        if etag and kwargs.get("match_condition") == MatchConditions.IfNotModified:
+            if self.get_blob_properties().etag != etag:
+                raise ResourceModifiedError(f"Blob was modified: {self.blob_name}")
+        return _LocalDownloader(self._path, offset, length)
+
+    def get_blob_properties(self, **kwargs):
+        self._require()
+        stat = self._path.stat()
+        return SimpleNamespace(
+            name=self.blob_name,
+            size=stat.st_size,
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        )
+
+    def delete_blob(self, **kwargs):
+        self._require()
+        self._path.unlink()
+
+
+class LocalContainerClient:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def get_blob_client(self, blob: str) -> LocalBlobClient:
+        return LocalBlobClient(self.root, blob)
+
+
+class _AsyncLocalDownloader:
+    def __init__(self, inner: _LocalDownloader):
+        self._inner = inner
+        self.size = inner.size
+
+    async def readall(self) -> bytes:
+        return await asyncio.to_thread(self._inner.readall)
+
+    async def chunks(self):
+        for chunk in self._inner.chunks():
+            yield chunk
+
+
+class AsyncLocalBlobClient:
+    def __init__(self, inner: LocalBlobClient):
+        self._inner = inner
+        self.blob_name = inner.blob_name
+
+    async def exists(self) -> bool:
+        return self._inner.exists()
+
+    async def upload_blob(self, data, overwrite: bool = False, **kwargs):
+        return await asyncio.to_thread(self._inner.upload_blob, data, overwrite)
+
+    async def stage_block(self, block_id: str, data, **kwargs):
+        await asyncio.to_thread(self._inner.stage_block, block_id, data)
+
+    async def commit_block_list(self, block_list, **kwargs):
+        return await asyncio.to_thread(self._inner.commit_block_list, block_list)
+
+    async def download_blob(self, offset: int | None = None, length: int | None = None, **kwargs):
+        return _AsyncLocalDownloader(self._inner.download_blob(offset, length))
+
+    async def get_blob_properties(self, **kwargs):
+        return self._inner.get_blob_properties()
+
+    async def delete_blob(self, **kwargs):
+        self._inner.delete_blob()
+
+
+class AsyncLocalContainerClient:
+    def __init__(self, root: str):
+        self._sync = LocalContainerClient(root)
+
+    def get_blob_client(self, blob: str) -> AsyncLocalBlobClient:
+        return AsyncLocalBlobClient(self._sync.get_blob_client(blob))
+
+    async def close(self):
+        pass
+
+
+# -------------------------
+# Streaming reads
+# -------------------------
+class BlobStreamReader(io.RawIOBase):
+    """
+    Read-only, forward-only file object over a blob download, pulling
+    `downloader.chunks()` on demand. Lets parsers (pd.read_csv with chunksize)
+    consume a blob without holding it in memory.
+    """
+
+    def __init__(self, blob_client):
+        self._chunks = iter(blob_client.download_blob().chunks())
+        self._buf = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            try:
+                self._buf = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def open_blob_stream(container, blob_path: str) -> io.BufferedReader:
+    return io.BufferedReader(BlobStreamReader(container.get_blob_client(blob_path)), LOCAL_CHUNK_SIZE)
+
+
+# -------------------------
+# Pooled clients
+# -------------------------
+@lru_cache
+def get_container_client():
+    """Process-wide sync container client (connection-pooled, reused across requests)."""
+    if settings.BLOB_LOCAL_ROOT:
+        return LocalContainerClient(settings.BLOB_LOCAL_ROOT)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.BLOB_POOL_SIZE,
+        pool_maxsize=settings.BLOB_POOL_SIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    transport = RequestsTransport(
+        session=session,
+        session_owner=False,
+        connection_timeout=settings.BLOB_CONNECTION_TIMEOUT,
+        read_timeout=settings.BLOB_READ_TIMEOUT,
+    )
+    service = BlobServiceClient.from_connection_string(
+        settings.AZURE_BLOB_CONNSTRING,
+        transport=transport,
+    )
+    return service.get_container_client(settings.BLOB_CONTAINER)
+
+
+_async_container = None
+_async_session = None
+
+
+def get_async_container_client():
+    """
+    Process-wide aio container client. Must be called from a running event
+    loop (the aiohttp connector binds to it).
+    """
+    global _async_container, _async_session
+    if _async_container is not None:
+        return _async_container
+
+    if settings.BLOB_LOCAL_ROOT:
+        _async_container = AsyncLocalContainerClient(settings.BLOB_LOCAL_ROOT)
+        return _async_container
+
+    _async_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=settings.BLOB_POOL_SIZE),
+        timeout=aiohttp.ClientTimeout(
+            sock_connect=settings.BLOB_CONNECTION_TIMEOUT,
+            sock_read=settings.BLOB_READ_TIMEOUT,
+        ),
+    )
+    transport = AioHttpTransport(session=_async_session, session_owner=False)
+    service = AsyncBlobServiceClient.from_connection_string(
+        settings.AZURE_BLOB_CONNSTRING,
+        transport=transport,
+    )
+    _async_container = service.get_container_client(settings.BLOB_CONTAINER)
+    return _async_container
+
+
+# -------------------------
+# SAS URLs (direct client <-> storage transfers)
+# -------------------------
+# Signing keys outlive the SAS tokens they sign by this much.
+_DELEGATION_KEY_LIFETIME = timedelta(hours=1)
+_delegation_key = None
+_delegation_key_expiry: datetime | None = None
+_delegation_lock = threading.Lock()
+
+
+def _user_delegation_key(service: BlobServiceClient, expiry: datetime):
+    """Cached Entra ID signing key, for accounts reached without an account key."""
+    global _delegation_key, _delegation_key_expiry
+    from azure.identity import DefaultAzureCredential
+
+    with _delegation_lock:
+        if _delegation_key is None or _delegation_key_expiry < expiry:
+            now = datetime.now(timezone.utc)
+            key_expiry = max(expiry, now + _DELEGATION_KEY_LIFETIME)
+            aad_service = BlobServiceClient(service.url, credential=DefaultAzureCredential())
+            _delegation_key = aad_service.get_user_delegation_key(now - timedelta(minutes=5), key_expiry)
+            _delegation_key_expiry = key_expiry
+        return _delegation_key
+
+
+def blob_sas_url(
+    blob_path: str,
+    permission: BlobSasPermissions,
+    expiry_minutes: int,
+    content_disposition: str | None = None,
+    content_type: str | None = None,
+) -> str | None:
+    """
+    Short-lived SAS URL for one blob, or None when storage can't sign one
+    (local filesystem stand-in). `content_disposition` / `content_type` are
+    returned by storage on reads, so browser downloads keep the upload name.
+    """
+    if settings.BLOB_LOCAL_ROOT:
+        return None
+
+    container = get_container_client()
+    blob = container.get_blob_client(blob_path)
+    now = datetime.now(timezone.utc)
+    expiry = now + timedelta(minutes=expiry_minutes)
+
+    account_key = getattr(container.credential, "account_key", None)
+    signing = {"account_key": account_key}
+    if not account_key:
+        service = BlobServiceClient(f"{container.scheme}://{container.primary_hostname}")
+        signing = {"user_delegation_key": _user_delegation_key(service, expiry)}
+
+    sas = generate_blob_sas(
+        account_name=container.account_name,
+        container_name=container.container_name,
+        blob_name=blob_path,
+        permission=permission,
+        start=now - timedelta(minutes=5),
+        expiry=expiry,
+        protocol="https",
+        content_disposition=content_disposition,
+        content_type=content_type,
+        **signing,
+    )
+    return f"{blob.url}?{sas}"
+
+
+async def close_storage():
+    global _async_container, _async_session
+    if _async_container is not None:
+        await _async_container.close()
+        _async_container = None
+    if _async_session is not None:
+        await _async_session.close()
+        _async_session = None
+
+
+# -------------------------
+# Streaming upload
+# -------------------------
+async def upload_stream(
+    blob_path: str,
+    read,
+    block_size: int,
+    concurrency: int,
+    commit_if=None,
+    **commit_kwargs,
+):
+    """
+    Upload from an async `read(n)` callable as staged blocks, with at most
+    `concurrency` blocks in flight. Peak memory is ~block_size * concurrency.
+
+    `commit_if`, when given, is awaited with the content hash before the
+    block list is committed; returning False leaves the blob uncommitted.
+
+    Returns (size_bytes, sha256 hex digest) computed while streaming.
+    """
+    blob = get_async_container_client().get_blob_client(blob_path)
+    digest = hashlib.sha256()
+    size = 0
+    block_ids: list[str] = []
+    pending: set[asyncio.Task] = set()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def stage(block_id: str, chunk: bytes):
+        try:
+            await blob.stage_block(block_id, chunk)
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            # Take a slot before reading so unsent blocks never exceed `concurrency`.
+            await slots.acquire()
+            chunk = await read(block_size)
+            if not chunk:
+                slots.release()
+                break
+
+            digest.update(chunk)
+            size += len(chunk)
+            block_id = f"{len(block_ids):08d}"
+            block_ids.append(block_id)
+            pending.add(asyncio.create_task(stage(block_id, chunk)))
+
+            finished = {t for t in pending if t.done()}
+            pending -= finished
+            for task in finished:
+                task.result()
+
+        await asyncio.gather(*pending)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+
+    content_hash = digest.hexdigest()
+    if commit_if is not None and not await commit_if(content_hash):
+        # Staged blocks that are never committed are discarded by the service.
+        return size, content_hash
+
+    await blob.commit_block_list([BlobBlock(block_id=b) for b in block_ids], **commit_kwargs)
+    return size, content_hash
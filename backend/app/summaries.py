@@ -0,0 +1,162 @@
+# backend/app/summaries.py
+"""
+AI summaries, decoupled from the insights response.
+
+Insights return a summary id straight away; the summary itself is computed
+in the background and memoized by (file content, filters, prompt version).
+The LLM client is injectable (`set_llm_client`) so tests can use a fake.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Protocol
+
+import pandas as pd
+from openai import OpenAI
+
+from app.config import get_settings
+from app.executor import AnalyticsExecutor, TaskStore
+from app.filter_index import is_noop_filter
+
+settings = get_settings()
+
+# Bump whenever the prompt changes so memoized summaries are regenerated.
+PROMPT_VERSION = "summary_v1"
+
+
+# -------------------------
+# LLM clients
+# -------------------------
+class LLMClient(Protocol):
+    def complete(self, prompt: str) -> str: ...
+
+
+class OpenAIChatClient:
+    def __init__(self, api_key: str, model: str):
+        self._client = OpenAI(api_key=api_key)
+        self.model = model
+
+    def complete(self, prompt: str) -> str:
+        response = self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.choices[0].message.content
+
+
+class FakeLLMClient:
+    """Deterministic stand-in for local development and tests."""
+
+    def __init__(self, reply: str = "Fake AI summary."):
+        self.reply = reply
+        self.prompts: list[str] = []
+
+    def complete(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.reply
+
+
+_llm_client: LLMClient | None = None
+
+
+def get_llm_client() -> LLMClient | None:
+    global _llm_client
+    if _llm_client is None:
+        if settings.LLM_PROVIDER == "fake":
+            _llm_client = FakeLLMClient()
+        else:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if api_key:
+                _llm_client = OpenAIChatClient(api_key, settings.LLM_MODEL)
+    return _llm_client
+
+
+def set_llm_client(client: LLMClient | None) -> None:
+    global _llm_client
+    _llm_client = client
+
+
+# -------------------------
+# AI Summary
+# -------------------------
+def generate_ai_summary(df: pd.DataFrame, client: LLMClient | None = None) -> str:
+    client = client or get_llm_client()
+    if client is None:
+        return "AI summary unavailable (missing OPENAI_API_KEY)."
+
+    try:
+        sample = df.head(20).to_csv(index=False)
+        prompt = f"""
+You are a data analyst. Explain the main patterns in the dataset below.
+Dataset sample:
+{sample}
+"""
+        return client.complete(prompt)
+
+    except Exception as e:
+        return f"AI summary unavailable: {type(e).__name__}"
+
+
+# -------------------------
+# Memoized background summaries
+# -------------------------
+def normalize_filters(filters: dict | None) -> dict:
+    return {
+        k: v for k, v in sorted((filters or {}).items())
+        if not is_noop_filter(v)
+    }
+
+
+def summary_key(content_version: str, filters: dict | None) -> str:
+    raw = json.dumps(
+        [content_version, normalize_filters(filters), PROMPT_VERSION],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryStore(TaskStore):
+    """
+    Memoized background summaries; see TaskStore. Also remembers which
+    content / sheet / filters each id was started for, so an id whose
+    summary has been evicted can be recomputed and checked for ownership.
+    """
+
+    def __init__(self, max_entries: int, max_requests: int):
+        super().__init__(max_entries)
+        self.max_requests = max_requests
+        self._requests: "OrderedDict[str, dict]" = OrderedDict()
+
+    def remember(self, key: str, content: str, sheet: int, filters: dict | None) -> None:
+        self._requests[key] = {
+            "content": content,
+            "sheet": sheet,
+            "filters": normalize_filters(filters),
+        }
+        self._requests.move_to_end(key)
+        while len(self._requests) > self.max_requests:
+            self._requests.popitem(last=False)
+
+    def request(self, key: str) -> dict | None:
+        return self._requests.get(key)
+
+    def status(self, key: str) -> dict | None:
+        status = super().status(key)
+        if status is not None:
+            status["summary"] = status.pop("result")
+        return status
+
+
+summary_store = SummaryStore(settings.SUMMARY_CACHE_MAX_ENTRIES, settings.SUMMARY_REQUESTS_MAX_ENTRIES)
+
+# Separate from analytics_executor: a tenant's pending summaries must not
+# delay (or count against the queue limit of) its insights requests.
+summary_executor = AnalyticsExecutor(
+    kind="thread",
+    cpu_workers=1,
+    io_workers=settings.SUMMARY_WORKERS,
+    tenant_max_concurrency=settings.SUMMARY_TENANT_MAX_CONCURRENCY,
+    tenant_max_queued=settings.SUMMARY_TENANT_MAX_QUEUED,
+)
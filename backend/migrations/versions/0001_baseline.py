@@ -0,0 +1,70 @@
+"""Baseline schema (tenants, users, files) as previously created by create_all
+
+Databases that were created by the old startup create_all already have
+these tables; mark them instead of running this revision:
+
+    alembic stamp 0001_baseline
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mssql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQL Server in production; SQLite (local runs) has no UNIQUEIDENTIFIER type.
+GUID = mssql.UNIQUEIDENTIFIER().with_variant(sa.CHAR(36), "sqlite")
+
+
+def _utcnow():
+    if op.get_context().dialect.name == "mssql":
+        return sa.func.sysutcdatetime()
+    return sa.text("(CURRENT_TIMESTAMP)")  # UTC on SQLite
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tenants",
+        sa.Column("id", GUID, primary_key=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("slug", sa.String(200), nullable=False, unique=True),
+        sa.Column("plan", sa.Enum("demo", "standard", name="tenantplan"), nullable=False, server_default="demo"),
+        sa.Column("trial_ends_at", sa.DateTime(timezone=True)),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default="1"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=_utcnow()),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", GUID, primary_key=True),
+        sa.Column("tenant_id", GUID, sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("display_name", sa.String(255)),
+        sa.Column("role", sa.Enum("admin", "user", name="userrole"), nullable=False, server_default="user"),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default="1"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=_utcnow()),
+    )
+    op.create_table(
+        "files",
+        sa.Column("id", GUID, primary_key=True),
+        sa.Column("tenant_id", GUID, sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("uploaded_by", GUID, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("original_name", sa.String(255), nullable=False),
+        sa.Column("blob_path", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(20), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger()),
+        sa.Column("status", sa.String(30), nullable=False, server_default="uploaded"),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), nullable=False, server_default=_utcnow()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("files")
+    op.drop_table("users")
+    op.drop_table("tenants")
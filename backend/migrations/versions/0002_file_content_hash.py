@@ -0,0 +1,21 @@
+"""files.content_hash (sha256 of the raw upload, computed while streaming)
+
+Revision ID: 0002_file_content_hash
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_file_content_hash"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("content_hash", sa.String(64)))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "content_hash")
@@ -0,0 +1,21 @@
+"""files.profile_path (ingest-time statistical profile blob)
+
+Revision ID: 0003_file_profile_path
+Revises: 0002_file_content_hash
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_file_profile_path"
+down_revision = "0002_file_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("profile_path", sa.String(500)))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "profile_path")
@@ -0,0 +1,21 @@
+"""files.sheet_names (JSON list of workbook sheet names, Excel only)
+
+Revision ID: 0004_file_sheet_names
+Revises: 0003_file_profile_path
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_file_sheet_names"
+down_revision = "0003_file_profile_path"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("sheet_names", sa.Text()))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "sheet_names")
@@ -0,0 +1,25 @@
+"""Indexes for duplicate-upload lookup and per-blob status updates
+
+- ix_files_tenant_content_hash  (same bytes within a tenant)
+- ix_files_blob_path            (ingest jobs update every row sharing a blob)
+
+Revision ID: 0005_file_dedup_indexes
+Revises: 0004_file_sheet_names
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005_file_dedup_indexes"
+down_revision = "0004_file_sheet_names"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_files_tenant_content_hash", "files", ["tenant_id", "content_hash"])
+    op.create_index("ix_files_blob_path", "files", ["blob_path"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_blob_path", table_name="files")
+    op.drop_index("ix_files_tenant_content_hash", table_name="files")
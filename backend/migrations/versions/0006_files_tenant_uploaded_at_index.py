@@ -0,0 +1,27 @@
+"""Index for keyset-paginated file listing (newest first per tenant)
+
+- ix_files_tenant_uploaded_at  (tenant_id, uploaded_at DESC, id DESC)
+
+Revision ID: 0006_files_tenant_uploaded_at_index
+Revises: 0005_file_dedup_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_files_tenant_uploaded_at_index"
+down_revision = "0005_file_dedup_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_files_tenant_uploaded_at",
+        "files",
+        ["tenant_id", sa.text("uploaded_at DESC"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_tenant_uploaded_at", table_name="files")
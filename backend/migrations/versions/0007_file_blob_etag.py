@@ -0,0 +1,21 @@
+"""files.blob_etag (raw blob version recorded when a direct upload completes)
+
+Revision ID: 0007_file_blob_etag
+Revises: 0006_files_tenant_uploaded_at_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_file_blob_etag"
+down_revision = "0006_files_tenant_uploaded_at_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("blob_etag", sa.String(100)))
+
+
+def downgrade() -> None:
+    op.drop_column("files", "blob_etag")
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+# app.config requires these at import time; tests never connect to either.
+os.environ.setdefault("AZURE_SQL_CONNSTRING", "Driver=unused")
+os.environ.setdefault("AZURE_BLOB_CONNSTRING", "UseDevelopmentStorage=true")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+# Route tests run the app against SQLite and the local blob stand-in, in a
+# scratch directory; ingest jobs are run inline (see `run_ingest`).
+_scratch = tempfile.mkdtemp(prefix="beam-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/app.db")
+os.environ.setdefault("BLOB_LOCAL_ROOT", os.path.join(_scratch, "blobs"))
+os.environ.setdefault("INGEST_QUEUE_PATH", os.path.join(_scratch, "ingest_jobs.sqlite3"))
+os.environ.setdefault("INGEST_WORKERS", "0")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="session")
+def client():
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+
+    cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    command.upgrade(cfg, "head")
+
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def auth(client) -> dict:
+    """Bearer headers for the admin of a new tenant."""
+    email = f"{uuid4().hex}@example.com"
+    client.post("/auth/register", json={"email": email, "password": "pw", "tenant_name": email})
+    token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def upload(client):
+    def upload(headers: dict, name: str, body: bytes) -> dict:
+        r = client.post("/api/files/upload", headers=headers, files={"uploaded_file": (name, body, "text/csv")})
+        assert r.status_code == 200, r.text
+        return r.json()
+    return upload
+
+
+@pytest.fixture
+def run_ingest(client):
+    from app import jobs
+
+    def run_ingest() -> None:
+        while (job := jobs.ingest_queue.claim()) is not None:
+            jobs.run_job(job)
+    return run_ingest
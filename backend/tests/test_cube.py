@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import insights
+from app.cube import AggregateCube
+from app.filter_index import categorize_low_cardinality
+
+
+def _frame(rows: int = 4000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amount = rng.normal(100, 25, rows)
+    amount[rng.random(rows) < 0.05] = np.nan
+    return categorize_low_cardinality(pd.DataFrame({
+        "region": rng.choice(["north", "south", "east", None], rows).astype(object),
+        "channel": rng.choice(["web", "store", "phone"], rows),
+        "amount": amount,
+        "units": rng.integers(1, 20, rows),
+    }))
+
+
+@pytest.fixture
+def dataset(monkeypatch):
+    dataset = insights.Dataset(_frame())
+    monkeypatch.setattr(insights, "get_container_client", lambda: None)
+    monkeypatch.setattr(insights, "load_dataset", lambda blob_path, sheet=0: dataset)
+    return dataset
+
+
+def _bars(result: dict) -> dict:
+    trace = result["charts"]["bar_chart"]["data"][0]
+    return dict(zip(trace["x"], trace["y"].tolist()))
+
+
+@pytest.mark.parametrize("filters", [
+    {"region": "north"},
+    {"region": ["south", "east"], "channel": "web"},
+    {"channel": ["phone"]},
+    {"region": ["nowhere"]},
+])
+def test_cube_matches_filtered_rows(dataset, monkeypatch, filters):
+    cube = insights.generate_insights("t/f/raw/data.parquet", filters)
+    assert cube["debug"]["source"] == "cube"
+
+    monkeypatch.setattr(AggregateCube, "query", lambda self, filters: None)
+    data = insights.generate_insights("t/f/raw/data.parquet", filters)
+    assert data["debug"]["source"] == "data"
+
+    assert cube["kpis"].keys() == data["kpis"].keys()
+    for label, value in data["kpis"].items():
+        assert cube["kpis"][label] == pytest.approx(value), label
+    assert cube["filters"] == data["filters"]
+    assert cube["charts"].keys() == data["charts"].keys()
+    if "bar_chart" in data["charts"]:
+        assert _bars(cube) == _bars(data)
+    if "histogram" in data["charts"]:
+        # Cube bins are fixed over the whole file, so only totals compare.
+        assert cube["charts"]["histogram"]["data"][0]["y"].sum() == data["charts"]["histogram"]["data"][0]["y"].sum()
+    if "correlation_matrix" in data["charts"]:
+        np.testing.assert_allclose(
+            np.asarray(cube["charts"]["correlation_matrix"]["data"][0]["z"], dtype="float64"),
+            np.asarray(data["charts"]["correlation_matrix"]["data"][0]["z"], dtype="float64"),
+        )
+
+
+def test_range_filters_fall_back_to_rows(dataset):
+    result = insights.generate_insights("t/f/raw/data.parquet", {"amount": {"min": 90}})
+    assert result["debug"]["source"] == "data"
+    assert result["kpis"]["Total Rows"] == int((dataset.df["amount"] >= 90).sum())
@@ -0,0 +1,115 @@
+CSV = b"region,amount\nnorth,1\nsouth,2\nnorth,3\n"
+
+
+def _status(client, headers, file_id) -> dict:
+    r = client.get(f"/api/files/{file_id}/status", headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_duplicate_upload_follows_the_original(client, auth, upload, run_ingest):
+    run_ingest()
+    original = upload(auth, "sales.csv", CSV)
+    pending_copy = upload(auth, "sales (1).csv", CSV)
+    assert original["status"] == pending_copy["status"] == "uploaded"
+    # One ingest job, shared through the blob.
+    assert _status(client, auth, original["id"])["job"]["id"] == _status(client, auth, pending_copy["id"])["job"]["id"]
+
+    run_ingest()
+    assert _status(client, auth, original["id"])["status"] == "ready"
+    assert _status(client, auth, pending_copy["id"])["status"] == "ready"
+
+    # A duplicate of a processed upload is ready straight away and serves insights.
+    ready_copy = upload(auth, "sales (2).csv", CSV)
+    assert ready_copy["status"] == "ready"
+    r = client.post(f"/api/files/{ready_copy['id']}/insights", headers=auth, json={})
+    assert r.status_code == 200, r.text
+    assert r.json()["kpis"]["Total Rows"] == 3
+
+
+def test_duplicates_are_per_tenant_and_per_content(client, auth, upload, run_ingest):
+    run_ingest()
+    first = upload(auth, "a.csv", CSV)
+    run_ingest()
+
+    other = upload(auth, "b.csv", CSV + b"east,4\n")
+    assert other["status"] == "uploaded"
+    assert _status(client, auth, other["id"])["job"]["id"] != _status(client, auth, first["id"])["job"]["id"]
+
+    email = "other-tenant@example.com"
+    client.post("/auth/register", json={"email": email, "password": "pw", "tenant_name": "Other"})
+    token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    assert upload({"Authorization": f"Bearer {token}"}, "a.csv", CSV)["status"] == "uploaded"
+
+
+def test_range_downloads(client, auth, upload):
+    file_id = upload(auth, "range.csv", CSV)["id"]
+    url = f"/api/files/{file_id}/download"
+    size = len(CSV)
+
+    full = client.get(url, headers=auth)
+    assert full.status_code == 200
+    assert full.content == CSV
+    assert full.headers["Accept-Ranges"] == "bytes"
+    etag = full.headers["ETag"]
+
+    for header, (start, end) in {
+        "bytes=0-4": (0, 4),
+        "bytes=7-": (7, size - 1),
+        "bytes=-5": (size - 5, size - 1),
+        f"bytes=3-{size + 100}": (3, size - 1),
+    }.items():
+        r = client.get(url, headers={**auth, "Range": header})
+        assert r.status_code == 206, header
+        assert r.headers["Content-Range"] == f"bytes {start}-{end}/{size}", header
+        assert r.headers["Content-Length"] == str(end - start + 1), header
+        assert r.content == CSV[start:end + 1], header
+
+    for header in (f"bytes={size}-", "bytes=5-2", "bytes=-0"):
+        r = client.get(url, headers={**auth, "Range": header})
+        assert r.status_code == 416, header
+        assert r.headers["Content-Range"] == f"bytes */{size}", header
+
+    # Unsupported forms fall back to the whole file.
+    assert client.get(url, headers={**auth, "Range": "bytes=0-1,4-5"}).status_code == 200
+
+    # If-Range: the range only applies while the blob is still that version.
+    assert client.get(url, headers={**auth, "Range": "bytes=0-4", "If-Range": etag}).status_code == 206
+    stale = client.get(url, headers={**auth, "Range": "bytes=0-4", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == CSV
+
+
+def test_listing_pages_with_a_keyset_cursor(client, auth, upload):
+    uploaded = [upload(auth, f"report_{i}.csv", CSV + str(i).encode())["id"] for i in range(5)]
+    upload(auth, "50%_off.csv", CSV + b"x")
+
+    def page(**params):
+        r = client.get("/api/files/", headers=auth, params=params)
+        assert r.status_code == 200, r.text
+        return [f["id"] for f in r.json()], r.headers.get("X-Next-Cursor")
+
+    seen, cursor = [], None
+    while True:
+        ids, cursor = page(limit=2, q="report", **({"cursor": cursor} if cursor else {}))
+        assert 0 < len(ids) <= 2
+        seen += ids
+        if cursor is None:
+            break
+    assert seen == uploaded[::-1]
+
+    # LIKE wildcards in the search text are matched literally.
+    assert len(page(q="50%_")[0]) == 1
+    assert page(q="%")[0] == page(q="50%")[0]
+
+
+def test_bad_cursor_is_a_400(client, auth):
+    import base64
+    import json
+
+    def encoded(value) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    for cursor in ("not a cursor", "é", encoded([1, 2]), encoded({"a": 1}), encoded(["2024-01-01T00:00:00", "nope"]), encoded(["2024-01-01T00:00:00", 7])):
+        r = client.get("/api/files/", headers=auth, params={"cursor": cursor})
+        assert r.status_code == 400, cursor
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.filter_index import FilterIndex, categorize_low_cardinality
+from app.insights import apply_filters
+
+
+def _frame(rows: int = 5000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    region = rng.choice(["north", "south", "east", None], rows).astype(object)
+    return categorize_low_cardinality(pd.DataFrame({
+        "region": region,
+        "channel": rng.choice(["web", "store"], rows),
+        "amount": rng.normal(100, 25, rows),
+        "day": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, rows), unit="D"),
+    }))
+
+
+@pytest.mark.parametrize("filters", [
+    {"region": "north"},
+    {"region": ["north", "east"]},
+    {"region": ["nowhere"]},
+    {"region": "all", "channel": []},
+    {"region": ["south"], "channel": "web"},
+    {"region": ["north", "south"], "amount": {"min": 90, "max": "110"}},
+    {"channel": "store", "day": {"min": "2024-02-01"}},
+    {"missing_column": "x", "channel": "web"},
+])
+def test_bitmap_index_matches_unindexed_filters(filters):
+    df = _frame()
+    index = FilterIndex(df)
+
+    expected = apply_filters(df, filters)
+    pd.testing.assert_frame_equal(apply_filters(df, filters, index), expected)
+
+    # Reference: plain pandas, one condition at a time.
+    reference = df
+    for key, val in filters.items():
+        if key not in df.columns or val in ("all", []):
+            continue
+        if isinstance(val, dict):
+            col = reference[key]
+            if "min" in val:
+                bound = pd.Timestamp(val["min"]) if key == "day" else float(val["min"])
+                reference = reference[col >= bound]
+                col = reference[key]
+            if "max" in val:
+                reference = reference[col <= float(val["max"])]
+        else:
+            reference = reference[reference[key].isin(val if isinstance(val, list) else [val])]
+    pd.testing.assert_frame_equal(expected, reference)
+
+
+def test_index_is_reused_and_sized():
+    df = _frame()
+    index = FilterIndex(df)
+    assert index.nbytes == 0
+    apply_filters(df, {"region": "north"}, index)
+    once = index.nbytes
+    assert once > 0
+    apply_filters(df, {"region": ["south", "east"]}, index)
+    assert index.nbytes == once
+
+
+def test_bad_range_bound_is_a_400():
+    df = _frame()
+    with pytest.raises(HTTPException) as e:
+        apply_filters(df, {"amount": {"min": "lots"}}, FilterIndex(df))
+    assert e.value.status_code == 400
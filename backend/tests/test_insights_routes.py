@@ -0,0 +1,44 @@
+CSV = b"region,amount\nnorth,1\nsouth,2\nnorth,3\neast,4\n"
+
+
+def _ready_file(auth, upload, run_ingest) -> str:
+    file_id = upload(auth, "sales.csv", CSV)["id"]
+    run_ingest()
+    return file_id
+
+
+def test_insights_revalidate_with_etag(client, auth, upload, run_ingest):
+    file_id = _ready_file(auth, upload, run_ingest)
+    url = f"/api/files/{file_id}/insights"
+
+    first = client.post(url, headers=auth, json={"filters": {"region": ["north"]}})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.json()["kpis"]["Total Rows"] == 2
+
+    # Same request again: byte-identical body from the response cache.
+    again = client.post(url, headers=auth, json={"filters": {"region": ["north"]}})
+    assert again.headers["ETag"] == etag
+    assert again.content == first.content
+
+    revalidated = client.post(url, headers={**auth, "If-None-Match": etag}, json={"filters": {"region": ["north"]}})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.content == b""
+
+    # No-op filters normalize away; real ones change the tag.
+    assert client.post(url, headers=auth, json={"filters": {"region": []}}).headers["ETag"] != etag
+    other = client.post(url, headers={**auth, "If-None-Match": etag}, json={"filters": {"region": ["south"]}})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+
+def test_pending_file_asks_to_retry(client, auth, upload, run_ingest):
+    run_ingest()
+    file_id = upload(auth, "later.csv", CSV + b"west,5\n")["id"]
+
+    r = client.post(f"/api/files/{file_id}/insights", headers={**auth, "Origin": "http://app.example"}, json={})
+    assert r.status_code == 409
+    assert r.headers["Retry-After"] == "2"
+    exposed = [h.strip().lower() for h in r.headers["Access-Control-Expose-Headers"].split(",")]
+    assert {"etag", "retry-after"} <= set(exposed)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from app.sampling import MIN_ROWS_PER_STRATUM, StratifiedReservoir
+
+
+def _chunks(n_chunks: int, rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(n_chunks):
+        yield pd.DataFrame({
+            "region": rng.choice(["north", "south", "east", "west"], rows, p=[0.7, 0.2, 0.07, 0.03]),
+            "amount": rng.normal(100, 10, rows),
+            "row": np.arange(i * rows, (i + 1) * rows),
+        })
+
+
+def test_reservoir_never_exceeds_cap_per_stratum():
+    # Groups fill up part-way through different chunks, so the fill and
+    # replacement phases both run within a single chunk.
+    reservoir = StratifiedReservoir(size=4 * MIN_ROWS_PER_STRATUM, strata_col="region")
+    for chunk in _chunks(n_chunks=20, rows=150):
+        reservoir.add(chunk)
+        cap = reservoir.per_stratum
+        for key, frame in reservoir._frames.items():
+            assert len(frame) <= cap, key
+            assert frame.index.is_unique, key
+
+    sample = reservoir.result()
+    for key, n_s in sample.sizes.items():
+        assert n_s == min(cap, sample.population[key]), key
+    assert sample.population_rows == 20 * 150
+    assert sample.df["row"].is_unique
+
+
+def test_filtered_sample_estimates_matching_rows():
+    reservoir = StratifiedReservoir(size=4 * MIN_ROWS_PER_STRATUM, strata_col="region")
+    chunks = list(_chunks(n_chunks=20, rows=150))
+    for chunk in chunks:
+        reservoir.add(chunk)
+    sample = reservoir.result()
+
+    full = pd.concat(chunks)
+    for rows, truth in (
+        (sample.df["region"].eq("east").to_numpy(), full["region"].eq("east").sum()),
+        (sample.df["amount"].gt(105).to_numpy(), full["amount"].gt(105).sum()),
+    ):
+        estimate, lo, hi = sample.take(rows).count_ci()
+        assert lo <= truth <= hi
+        assert abs(estimate - truth) / truth < 0.15
+
+    # A stratum that was kept whole is counted exactly.
+    west = sample.take(sample.df["region"].eq("west").to_numpy())
+    assert west.count_ci() == (full["region"].eq("west").sum(),) * 3
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from app.profiling import ProfileAggregator
+from app.schema import apply_schema, infer_types, schema_of
+
+
+def _chunks():
+    # The first chunk's values would fit int8 / float32; later ones don't.
+    yield pd.DataFrame({"qty": [1, 2, 3, 4], "amount": [1.5, 2.25, 3.0, 4.5]})
+    yield pd.DataFrame({"qty": [120, 300, 70_000, 5_000_000_000], "amount": [860.7, 1e40, 12.345, 0.1]})
+
+
+def test_schema_from_first_chunk_keeps_later_chunks_exact():
+    chunks = list(_chunks())
+    schema = schema_of(infer_types(chunks[0], downcast=False))
+    assert schema["columns"] == {"qty": "int64", "amount": "float64"}
+
+    agg = ProfileAggregator()
+    for chunk in chunks:
+        typed = apply_schema(chunk, schema)
+        pd.testing.assert_frame_equal(typed, chunk)
+        agg.add(typed)
+
+    full = pd.concat(chunks, ignore_index=True)
+    assert np.isclose(agg.result()["columns"]["amount"]["mean"], full["amount"].mean())
+    assert np.isclose(agg.result()["columns"]["qty"]["mean"], full["qty"].mean())
+
+
+def test_compact_schema_widens_values_out_of_its_range():
+    first, later = _chunks()
+    schema = schema_of(infer_types(first))
+    assert schema["columns"] == {"qty": "int8", "amount": "float32"}
+
+    typed = apply_schema(later, schema)
+    assert typed["qty"].tolist() == later["qty"].tolist()
+    assert typed["amount"].tolist() == later["amount"].tolist()
+
+    # Values that do fit are still cast to the compact type.
+    assert apply_schema(first, schema).dtypes.astype(str).to_dict() == {"qty": "int8", "amount": "float32"}
@@ -1,28 +1,69 @@
 "use client";
 
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useState } from "react";
 
 interface AIInsightsProps {
   fileId: string;
-  initialSummary: string | null;
+  summaryId: string | null;
   token: string;
 }
 
-export default function AIInsights({ fileId, initialSummary, token }: AIInsightsProps) {
-  const [summary, setSummary] = useState<string | null>(initialSummary);
+const API_BASE_URL =
+  process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000";
+
+type SummaryStatus = {
+  id: string;
+  status: "pending" | "ready" | "failed";
+  summary: string | null;
+};
+
+export default function AIInsights({ fileId, summaryId, token }: AIInsightsProps) {
+  const [summary, setSummary] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
 
-  // keep summary updated if initialSummary changes after fetch
+  // The summary is computed in the background; long-poll until it's ready.
   useEffect(() => {
-    setSummary(initialSummary);
-  }, [initialSummary]);
+    if (!summaryId) return;
+    let cancelled = false;
+
+    const poll = async () => {
+      setLoading(true);
+      try {
+        for (let attempt = 0; attempt < 10 && !cancelled; attempt++) {
+          const res = await fetch(
+            `${API_BASE_URL}/api/files/${fileId}/ai-summary/${summaryId}?wait=25`,
+            { headers: { Authorization: `Bearer ${token}` } }
+          );
+          if (!res.ok) throw new Error(`AI summary request failed: ${res.status}`);
+
+          const data = (await res.json()) as SummaryStatus;
+          if (data.status === "pending") continue;
+          if (!cancelled) {
+            setSummary(
+              data.status === "ready" ? data.summary : "AI summary unavailable right now."
+            );
+          }
+          return;
+        }
+      } catch (err) {
+        console.error("AI summary error:", err);
+        if (!cancelled) setSummary("AI summary unavailable right now.");
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+
+    poll();
+    return () => {
+      cancelled = true;
+    };
+  }, [fileId, summaryId, token]);
 
   const regenerate = async () => {
     try {
       setLoading(true);
 
-      const base = process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000";
-      const res = await fetch(`${base}/api/files/${fileId}/ai-summary`, {
+      const res = await fetch(`${API_BASE_URL}/api/files/${fileId}/ai-summary?force=true`, {
         method: "POST",
         headers: {
           Authorization: `Bearer ${token}`,
@@ -5,11 +5,11 @@ import AIInsights from "./AIInsights";
 
 export default function AIWidget({
   fileId,
-  initialSummary,
+  summaryId,
   token,
 }: {
   fileId: string;
-  initialSummary: string | null;
+  summaryId: string | null;
   token: string;
 }) {
   const [open, setOpen] = useState(false);
@@ -50,7 +50,7 @@ export default function AIWidget({
 
         {/* Content */}
         <div className="p-4">
-          <AIInsights fileId={fileId} initialSummary={initialSummary} token={token} />
+          <AIInsights fileId={fileId} summaryId={summaryId} token={token} />
         </div>
       </div>
     </>
@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useEffect, useState, useCallback, useMemo } from "react";
+import React, { useEffect, useState, useCallback, useMemo, useRef } from "react";
 import { useParams } from "next/navigation";
 import { useAuth } from "@/context/AuthContext";
 import { useTheme } from "@/context/ThemeContext";
@@ -12,7 +12,7 @@ type InsightsResponse = {
   kpis: Record<string, any>;
   charts: Record<string, any>;
   filters: Record<string, string[]>;
-  ai_summary?: string | null;
+  ai_summary_id?: string | null;
 };
 
 type FiltersState = Record<string, string | null>;
@@ -37,6 +37,11 @@ export default function FileInsightsPage() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
+  // Last response per filter set, revalidated with If-None-Match (304 = reuse)
+  const responseCache = useRef(
+    new Map<string, { etag: string; data: InsightsResponse }>()
+  );
+
   const hasToken = !!tokens?.accessToken;
 
   const plotTheme = useMemo(() => {
@@ -69,14 +74,30 @@ export default function FileInsightsPage() {
         setLoading(true);
         setError(null);
 
-        const res = await fetch(`${API_BASE_URL}/api/files/${fileId}/insights`, {
-          method: "POST",
-          headers: {
-            Authorization: `Bearer ${tokens!.accessToken}`,
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({ filters: nextFilters }),
-        });
+        const body = JSON.stringify({ filters: nextFilters });
+        const cached = responseCache.current.get(`${fileId}:${body}`);
+
+        // 409 = the upload is still being processed; retry until it's ready.
+        let res: Response;
+        for (let attempt = 0; ; attempt++) {
+          res = await fetch(`${API_BASE_URL}/api/files/${fileId}/insights`, {
+            method: "POST",
+            headers: {
+              Authorization: `Bearer ${tokens!.accessToken}`,
+              "Content-Type": "application/json",
+              ...(cached ? { "If-None-Match": cached.etag } : {}),
+            },
+            body,
+          });
+          if (res.status !== 409 || attempt >= 150) break;
+          const retryAfter = Number(res.headers.get("Retry-After")) || 2;
+          await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+        }
+
+        if (res.status === 304 && cached) {
+          setInsights(cached.data);
+          return;
+        }
 
         if (!res.ok) {
           const text = await res.text();
@@ -86,6 +107,10 @@ export default function FileInsightsPage() {
         }
 
         const data = (await res.json()) as InsightsResponse;
+        const etag = res.headers.get("ETag");
+        if (etag) {
+          responseCache.current.set(`${fileId}:${body}`, { etag, data });
+        }
         setInsights(data);
       } catch (err: any) {
         console.error("Insights error:", err);
@@ -323,7 +348,7 @@ export default function FileInsightsPage() {
         {/* AI Insights Panel */}
         <AIWidget
           fileId={fileId}
-          initialSummary={(insights as any).ai_summary ?? null}
+          summaryId={insights.ai_summary_id ?? null}
           token={tokens!.accessToken ?? ""}
         />
       </main>
@@ -16,16 +16,23 @@ type FileSummary = {
 const API_BASE_URL =
   process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000";
 
+const PAGE_SIZE = 50;
+
 export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
   const [files, setFiles] = useState<FileSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [downloadingId, setDownloadingId] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [search, setSearch] = useState("");
+  const [query, setQuery] = useState("");
 
   const pathname = usePathname();
   const { tokens } = useAuth();
 
-  async function loadFiles() {
+  // cursor = null loads the first page; otherwise appends the next one.
+  async function loadFiles(cursor: string | null = null) {
     if (!tokens?.accessToken) {
       setError("Not authenticated");
       setLoading(false);
@@ -33,11 +40,16 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
     }
 
     try {
-      setLoading(true);
+      if (cursor) setLoadingMore(true);
+      else setLoading(true);
       setError(null);
 
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (query) params.set("q", query);
+      if (cursor) params.set("cursor", cursor);
+
       // 🔥 TRAILING SLASH REQUIRED FOR AZURE ACA
-      const res = await fetch(`${API_BASE_URL}/api/files/`, {
+      const res = await fetch(`${API_BASE_URL}/api/files/?${params}`, {
         headers: {
           Authorization: `Bearer ${tokens.accessToken}`,
         },
@@ -48,11 +60,13 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
       }
 
       const data = (await res.json()) as FileSummary[];
-      setFiles(data);
+      setFiles((prev) => (cursor ? [...prev, ...data] : data));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
     } catch (err: any) {
       setError(err.message || "Failed to load files");
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   }
 
@@ -66,6 +80,24 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
       setError(null);
       setDownloadingId(file.id);
 
+      // Direct-from-storage download when the API hands out SAS URLs.
+      const direct = await fetch(`${API_BASE_URL}/api/files/${file.id}/download-url`, {
+        headers: {
+          Authorization: `Bearer ${tokens.accessToken}`,
+        },
+      });
+      if (direct.ok) {
+        const { url: sasUrl } = (await direct.json()) as { url: string | null };
+        if (sasUrl) {
+          const a = document.createElement("a");
+          a.href = sasUrl;
+          document.body.appendChild(a);
+          a.click();
+          a.remove();
+          return;
+        }
+      }
+
       // 🔥 Keep consistent with ACA trailing slash behavior
       const res = await fetch(`${API_BASE_URL}/api/files/${file.id}/download/`, {
         headers: {
@@ -97,7 +129,13 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
 
   useEffect(() => {
     loadFiles();
-  }, [tokens?.accessToken, reloadFlag]); // 🔥 reload on upload
+  }, [tokens?.accessToken, reloadFlag, query]); // 🔥 reload on upload
+
+  // Debounce typing into the server-side name search.
+  useEffect(() => {
+    const t = setTimeout(() => setQuery(search.trim()), 300);
+    return () => clearTimeout(t);
+  }, [search]);
 
   return (
     <div className="flex-1 overflow-y-auto">
@@ -107,6 +145,16 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
         </span>
       </div>
 
+      <div className="px-4 pb-2">
+        <input
+          type="search"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search files…"
+          className="w-full rounded border border-(--border) bg-(--bg-panel) px-2 py-1 text-xs text-(--text-main)"
+        />
+      </div>
+
       {loading && (
         <div className="px-4 py-2 text-xs text-(--text-muted)">
           Loading files…
@@ -119,7 +167,7 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
 
       {!loading && !error && files.length === 0 && (
         <div className="px-4 py-2 text-xs text-(--text-muted)">
-          No files uploaded yet.
+          {query ? "No matching files." : "No files uploaded yet."}
         </div>
       )}
 
@@ -185,6 +233,17 @@ export default function SidebarFiles({ reloadFlag }: { reloadFlag: number }) {
             </div>
           );
         })}
+
+        {nextCursor && !loading && (
+          <button
+            type="button"
+            className="w-full rounded-md px-2 py-1 text-xs text-(--text-muted) hover:bg-(--bg-panel-2)"
+            onClick={() => loadFiles(nextCursor)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Loading…" : "Load more"}
+          </button>
+        )}
       </nav>
     </div>
   );
@@ -83,21 +83,110 @@ export async function apiMe(accessToken: string): Promise<MeResponse> {
 
 // --- FILES ---
 
+// One page, newest first; pass `nextCursor` back as `cursor` for the next one.
 export async function apiListFiles(
-  accessToken: string
-): Promise<FileItem[]> {
-  const res = await fetch(`${API_BASE_URL}/api/files/`, {
+  accessToken: string,
+  options: { limit?: number; cursor?: string | null; q?: string } = {}
+): Promise<{ files: FileItem[]; nextCursor: string | null }> {
+  const params = new URLSearchParams();
+  if (options.limit) params.set("limit", String(options.limit));
+  if (options.cursor) params.set("cursor", options.cursor);
+  if (options.q) params.set("q", options.q);
+
+  const res = await fetch(`${API_BASE_URL}/api/files/?${params}`, {
     headers: {
       Authorization: `Bearer ${accessToken}`,
     },
   });
-  return handleJson<FileItem[]>(res);
+  const files = await handleJson<FileItem[]>(res);
+  return { files, nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+interface UploadUrlResponse {
+  upload_url: string | null;
+  upload_token?: string;
+  block_size?: number;
+  concurrency?: number;
+}
+
+// Put Block + Put Block List straight to Blob Storage through a SAS URL.
+async function uploadBlocks(
+  uploadUrl: string,
+  file: File,
+  blockSize: number,
+  concurrency: number
+): Promise<void> {
+  const count = Math.max(1, Math.ceil(file.size / blockSize));
+  // Block ids must be base64 and equal length within a blob.
+  const blockIds = Array.from({ length: count }, (_, i) =>
+    btoa(String(i).padStart(8, "0"))
+  );
+
+  let next = 0;
+  async function worker() {
+    while (next < count) {
+      const i = next++;
+      const res = await fetch(
+        `${uploadUrl}&comp=block&blockid=${encodeURIComponent(blockIds[i])}`,
+        {
+          method: "PUT",
+          body: file.slice(i * blockSize, (i + 1) * blockSize),
+        }
+      );
+      if (!res.ok) throw new Error(`Block upload failed: ${res.status}`);
+    }
+  }
+  await Promise.all(Array.from({ length: Math.min(concurrency, count) }, worker));
+
+  const blockList =
+    `<?xml version="1.0" encoding="utf-8"?><BlockList>` +
+    blockIds.map((id) => `<Latest>${id}</Latest>`).join("") +
+    `</BlockList>`;
+  const res = await fetch(`${uploadUrl}&comp=blocklist`, {
+    method: "PUT",
+    headers: { "x-ms-blob-content-type": file.type || "application/octet-stream" },
+    body: blockList,
+  });
+  if (!res.ok) throw new Error(`Block list commit failed: ${res.status}`);
 }
 
 export async function apiUploadFile(
   accessToken: string,
   file: File
 ): Promise<FileItem> {
+  // Direct-to-storage upload when the API can mint SAS URLs.
+  const urlRes = await fetch(`${API_BASE_URL}/api/files/upload-url`, {
+    method: "POST",
+    headers: {
+      Authorization: `Bearer ${accessToken}`,
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      filename: file.name,
+      content_type: file.type,
+      size_bytes: file.size,
+    }),
+  });
+  const direct = await handleJson<UploadUrlResponse>(urlRes);
+
+  if (direct.upload_url) {
+    await uploadBlocks(
+      direct.upload_url,
+      file,
+      direct.block_size || 4 * 1024 * 1024,
+      direct.concurrency || 4
+    );
+    const res = await fetch(`${API_BASE_URL}/api/files/upload-complete`, {
+      method: "POST",
+      headers: {
+        Authorization: `Bearer ${accessToken}`,
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ upload_token: direct.upload_token }),
+    });
+    return handleJson<FileItem>(res);
+  }
+
   const formData = new FormData();
   formData.append("uploaded_file", file);
 